@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for RestCLI's client hot paths
+
+Measures, against a local `restcli mock` server and a throwaway HOME:
+- per-request overhead of make_request over raw http.client
+- replace_env_vars as the environment and the body grow
+- save_to_history as the history grows
+- JSON formatting throughput for large bodies
+- CLI cold-start time
+
+Results are written as JSON and compared with a stored baseline; any
+benchmark slower than the baseline by more than the threshold is reported
+and makes the run exit with status 1.
+
+Run: python benchmarks/run_benchmarks.py [--quick] [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+# restcli reads its data paths from HOME at import, so isolate it first
+HOME = tempfile.mkdtemp(prefix='restcli-bench-')
+os.environ['HOME'] = HOME
+os.environ['RESTCLI_NO_DAEMON'] = '1'
+sys.path.insert(0, str(ROOT))
+
+import restcli  # noqa: E402
+
+
+# Seconds each timed round should last, scaled down by --quick
+ROUND_TIME = 0.1
+
+
+def measure(operation, scale: float, repeat: int = 7, number: int = 0) -> float:
+    """Seconds per call of operation(): the fastest of `repeat` rounds.
+
+    Unless `number` fixes the calls per round, it doubles (like timeit's
+    autorange) until a round takes ROUND_TIME * scale, so microsecond
+    operations are not lost in timer and scheduler noise.
+    """
+    if not number:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                operation()
+            if time.perf_counter() - start >= ROUND_TIME * scale:
+                break
+            number *= 2
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bench_make_request(scale: float) -> dict:
+    """Per-request cost of make_request vs. raw http.client on one keep-alive connection"""
+    import http.client
+    results = {}
+    with restcli.MockServer() as server:
+        host, port = server.httpd.server_address[:2]
+        connection = http.client.HTTPConnection(host, port)
+
+        def raw():
+            connection.request('GET', '/json/1')
+            connection.getresponse().read()
+
+        pool = restcli.ConnectionPool()
+        url = server.url + '/json/1'
+
+        def client():
+            restcli.make_request('GET', url, {}, None, pool=pool)
+
+        raw()
+        client()
+        results['http.client GET'] = measure(raw, scale)
+        results['make_request GET'] = measure(client, scale)
+        results['make_request overhead'] = max(results['make_request GET'] - results['http.client GET'], 0.0)
+        connection.close()
+        pool.close()
+    return results
+
+
+def bench_replace_env_vars(scale: float) -> dict:
+    """Rendering a body with 20 {{VAR}} references, by environment and body size"""
+    results = {}
+    for env_size in (10, 1000, 10000):
+        env = {f'VAR_{i}': f'value-{i}' for i in range(env_size)}
+        for body_kb in (1, 100):
+            filler = 'x' * (body_kb * 1024 // 20)
+            body = ''.join(f'{filler}{{{{VAR_{i * env_size // 20}}}}}' for i in range(20))
+            results[f'replace_env_vars env={env_size} body={body_kb}KB'] = measure(
+                lambda: restcli.replace_env_vars(body, env), scale)
+
+    body = '{"id": "{{VAR_1}}", "token": "{{TOKEN:-none}}"}' * 500
+    env = {'VAR_1': '1'}
+
+    def cold():
+        restcli._cached_template.cache_clear()
+        restcli._cached_large_template.cache_clear()
+        restcli.replace_env_vars(body, env)
+
+    results['replace_env_vars uncached template'] = measure(cold, scale)
+    return results
+
+
+def bench_save_to_history(scale: float) -> dict:
+    """One save_to_history call with 0, 1k and 10k entries already recorded"""
+    results = {}
+    os.environ['RESTCLI_HISTORY_LIMIT'] = '100000'
+    response = {'status': 200, 'duration': 0.012, 'size': 512, 'wire_size': 512,
+                'timings': {'dns': 0.1, 'connect': 0.2, 'ttfb': 5.0}, 'body': '{"ok": true}' * 40}
+    headers = {'Accept': 'application/json', 'Authorization': 'Bearer abc'}
+    restcli.ensure_data_dirs()
+
+    def save():
+        restcli.save_to_history('GET', 'https://api.example.com/items/1', headers, None, response)
+
+    store = restcli.get_history_store()
+    for size in (0, 1000, 10000):
+        while len(store) < size:
+            save()
+        # A fixed count, so the history stays close to `size` while timed
+        results[f'save_to_history at {size} entries'] = measure(
+            save, scale, repeat=3, number=max(20, int(200 * scale)))
+    del os.environ['RESTCLI_HISTORY_LIMIT']
+    return results
+
+
+def bench_json_format(scale: float) -> dict:
+    """Seconds per MB to pretty-print a large JSON body, plain and colored"""
+    import io
+    items = [{'id': i, 'name': f'item {i}', 'tags': ['a', 'b'], 'price': i * 1.5,
+              'active': i % 2 == 0, 'owner': {'id': i % 97, 'email': f'user{i}@example.com'}}
+             for i in range(8000)]
+    body = json.dumps(items)
+    megabytes = len(body) / 1e6
+
+    def plain():
+        restcli.print_json(body, io.StringIO())
+
+    def colored():
+        printer = restcli.JsonStreamPrinter(io.StringIO(), color=True)
+        for start in range(0, len(body), restcli.STREAM_CHUNK_SIZE):
+            printer.feed(body[start:start + restcli.STREAM_CHUNK_SIZE])
+        printer.close()
+
+    return {
+        'print_json per MB': measure(plain, scale, repeat=3) / megabytes,
+        'print_json colored per MB': measure(colored, scale, repeat=3) / megabytes,
+    }
+
+
+def bench_cold_start(scale: float) -> dict:
+    """Wall time of a fresh `restcli` process, median of several runs"""
+    results = {}
+    runs = max(3, int(15 * scale))
+    commands = {'cold start: env get': ['env', 'get', 'TOKEN'],
+                'cold start: get --help': ['get', '--help']}
+    for name, argv in commands.items():
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, str(ROOT / 'restcli.py')] + argv,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+            times.append(time.perf_counter() - start)
+        results[name] = statistics.median(times)
+    return results
+
+
+BENCHMARKS = {
+    'make_request': bench_make_request,
+    'replace_env_vars': bench_replace_env_vars,
+    'save_to_history': bench_save_to_history,
+    'json_format': bench_json_format,
+    'cold_start': bench_cold_start,
+}
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+# Derived from two noisy measurements, so shown but never failed on
+INFORMATIONAL = {'make_request overhead'}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print results next to the baseline; return the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':44s} {'baseline':>10s} {'current':>10s} {'change':>8s}")
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:44s} {'-':>10s} {format_seconds(seconds):>10s} {'new':>8s}")
+            continue
+        change = (seconds - before) / before if before else 0.0
+        flag = ''
+        if name in INFORMATIONAL:
+            flag = '  (info)'
+        elif change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:44s} {format_seconds(before):>10s} {format_seconds(seconds):>10s} "
+              f"{change:+8.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark restcli hot paths against a baseline')
+    parser.add_argument('-o', '--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', default=str(BASELINE), help='Baseline JSON (default: benchmarks/baseline.json)')
+    parser.add_argument('--threshold', type=float, default=25,
+                        help='Percent slower than baseline that counts as a regression (default: 25)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--quick', action='store_true', help='Fewer iterations, for a smoke run')
+    parser.add_argument('--only', action='append', choices=list(BENCHMARKS), help='Run only these groups')
+    args = parser.parse_args(argv)
+
+    scale = 0.1 if args.quick else 1.0
+    results = {}
+    for group, bench in BENCHMARKS.items():
+        if args.only and group not in args.only:
+            continue
+        print(f"Running {group}...", flush=True)
+        results.update(bench(scale))
+
+    report = {
+        'restcli': restcli.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'quick': args.quick,
+        'results': results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n')
+
+    baseline_file = Path(args.baseline)
+    regressions = []
+    if baseline_file.exists():
+        baseline = json.loads(baseline_file.read_text())
+        print(f"\nBaseline: Python {baseline.get('python')} on {baseline.get('platform')}")
+        regressions = compare(results, baseline.get('results', {}), args.threshold / 100)
+    else:
+        compare(results, {}, args.threshold / 100)
+
+    if args.save_baseline:
+        baseline_file.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"\nSaved baseline to {baseline_file}")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) more than {args.threshold:g}% slower than baseline")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    import shutil
+    try:
+        sys.exit(main())
+    finally:
+        shutil.rmtree(HOME, ignore_errors=True)
@@ -8,18 +8,29 @@ License: MIT
 GitHub: https://github.com/DonkRonk17/RestCLI
 """
 
+# Only cheap modules are imported here. The network, asyncio, sqlite and
+# date stacks are imported inside the functions that use them, so commands
+# such as `restcli env get` start without loading them.
 import sys
 import io
 import json
-import urllib.request
-import urllib.error
-import urllib.parse
+import re
+import functools
+import threading
 import time
 import os
 import argparse
+import struct
+import codecs
+import zlib
+import contextlib
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, BinaryIO, Callable, Iterable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: history appends are not locked across processes
+    fcntl = None
 
 # Ensure UTF-8 encoding for Windows
 if sys.platform == 'win32':
@@ -30,9 +41,17 @@ __version__ = "1.1.0"
 
 # Data storage paths
 DATA_DIR = Path.home() / ".restcli"
-HISTORY_FILE = DATA_DIR / "history.json"
+HISTORY_FILE = DATA_DIR / "history.json"  # Legacy format, migrated on first use
+HISTORY_LOG = DATA_DIR / "history.jsonl"
+HISTORY_INDEX = DATA_DIR / "history.idx"
+HISTORY_DB = DATA_DIR / "history.db"
 COLLECTIONS_DIR = DATA_DIR / "collections"
+CACHE_DIR = DATA_DIR / "cache"
+BLOB_DIR = DATA_DIR / "blobs"  # Response bodies, when RESTCLI_STORE_BODIES is set
+BASELINES_DIR = DATA_DIR / "baselines"  # Per-collection body hashes for `collection run --diff`
 ENV_FILE = DATA_DIR / "environment.json"
+DAEMON_SOCKET = DATA_DIR / "daemon.sock"
+DNS_FILE = DATA_DIR / "dns.json"  # Shared lookups when RESTCLI_DNS_CACHE=disk
 
 
 class Colors:
@@ -49,15 +68,13 @@ class Colors:
 
 
 def ensure_data_dirs():
-    """Create data directories if they don't exist"""
+    """Create data directories if they don't exist.
+
+    Only commands that write under DATA_DIR call this; readers such as
+    `env get` treat missing files as empty.
+    """
     DATA_DIR.mkdir(exist_ok=True)
     COLLECTIONS_DIR.mkdir(exist_ok=True)
-    
-    if not HISTORY_FILE.exists():
-        save_json(HISTORY_FILE, [])
-    
-    if not ENV_FILE.exists():
-        save_json(ENV_FILE, {})
 
 
 def save_json(filepath: Path, data: Any):
@@ -75,12 +92,95 @@ def load_json(filepath: Path) -> Any:
         return [] if 'history' in str(filepath) else {}
 
 
-def replace_env_vars(text: str, env: Dict[str, str]) -> str:
-    """Replace {{VAR}} with environment variable values"""
-    result = text
-    for key, value in env.items():
-        result = result.replace(f"{{{{{key}}}}}", value)
-    return result
+# {{NAME}} or {{NAME:-default}}; a default may itself hold {{OTHER}} references
+TEMPLATE_PATTERN = re.compile(r'\{\{([^{}]+?)(?::-((?:[^{}]|\{\{[^{}]*\}\})*))?\}\}')
+MAX_TEMPLATE_DEPTH = 10
+
+
+class Template:
+    """A {{VAR}} template parsed once into literal and variable segments.
+
+    Rendering walks the segments instead of rescanning the text, so the
+    cost is one pass over the output regardless of how many variables the
+    environment holds. Values that themselves contain {{...}} references
+    are expanded recursively up to MAX_TEMPLATE_DEPTH levels.
+    """
+    __slots__ = ('segments', 'variables')
+
+    def __init__(self, text: str):
+        self.segments: List[Any] = []
+        self.variables = set()
+        pos = 0
+        for match in TEMPLATE_PATTERN.finditer(text):
+            if match.start() > pos:
+                self.segments.append(text[pos:match.start()])
+            name, default = match.group(1), match.group(2)
+            default_template = compile_template(default) if default is not None else None
+            self.segments.append((name, default_template, match.group(0)))
+            self.variables.add(name)
+            if default_template is not None:
+                self.variables |= default_template.variables
+            pos = match.end()
+        if pos < len(text):
+            self.segments.append(text[pos:])
+
+    def render(self, env: Dict[str, Any], missing: Optional[set] = None,
+               depth: int = 0) -> str:
+        """Substitute env values; unresolved names are left as-is and added to `missing`"""
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+                continue
+            name, default, raw = segment
+            value = env.get(name)
+            if value is None or (value == '' and default is not None):
+                if default is not None:
+                    parts.append(default.render(env, missing, depth))
+                else:
+                    if missing is not None:
+                        missing.add(name)
+                    parts.append(raw)
+                continue
+            value = str(value)
+            if '{{' in value and depth < MAX_TEMPLATE_DEPTH:
+                value = compile_template(value).render(env, missing, depth + 1)
+            parts.append(value)
+        return ''.join(parts)
+
+
+# Longer templates (whole request bodies) get a cache of their own that
+# holds only a few, so a long-running daemon or fan-out cannot pin
+# hundreds of multi-MB bodies in memory
+TEMPLATE_CACHE_MAX_CHARS = 64 * 1024
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_template(text: str) -> Template:
+    return Template(text)
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_large_template(text: str) -> Template:
+    return Template(text)
+
+
+def compile_template(text: str) -> Template:
+    """Parse a template, reusing the compiled form for identical text"""
+    if len(text) > TEMPLATE_CACHE_MAX_CHARS:
+        return _cached_large_template(text)
+    return _cached_template(text)
+
+
+def replace_env_vars(text: str, env: Dict[str, str], missing: Optional[set] = None) -> str:
+    """Replace {{VAR}} and {{VAR:-default}} with environment variable values.
+
+    Names that cannot be resolved are left in place and, if `missing` is
+    given, collected into it.
+    """
+    if '{{' not in text:
+        return text
+    return compile_template(text).render(env, missing)
 
 
 def parse_headers(header_list: List[str]) -> Dict[str, str]:
@@ -125,6 +225,291 @@ def print_banner():
     print(banner)
 
 
+def print_unresolved(names: List[str], out=None):
+    """Warn about {{VAR}} references that had no value"""
+    if names:
+        listed = ', '.join(f'{{{{{name}}}}}' for name in names)
+        print(f"{Colors.YELLOW}[!] Unresolved variables: {listed}{Colors.RESET}", file=out or sys.stdout)
+
+
+class JsonStreamPrinter:
+    """Pretty-print JSON text as it arrives, without building the tree.
+
+    feed() tokenizes each chunk and writes the reformatted text straight
+    to `out` (indent=2 layout, colorized when `color` is set). Arrays
+    longer than `max_items` are cut short with a count of what was left
+    out, and containers nested deeper than `max_depth` collapse to
+    "[... N items]". Consecutive top-level values (JSON Lines) each end
+    with a newline. Input that stops being valid JSON is passed through
+    verbatim from that point on.
+    """
+    # Strings, punctuation, bare scalars, or the opening quote of a string cut off by the chunk end
+    TOKENS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],:]|[^\s{}\[\],:"]+|"')
+    # The inside of a string up to its closing quote (or a final lone backslash)
+    STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*')
+
+    def __init__(self, out, max_items: Optional[int] = None, max_depth: Optional[int] = None,
+                 color: bool = False, indent: int = 2):
+        self.out = out
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.indent = ' ' * indent
+        self.failed = False
+        palette = (Colors.CYAN, Colors.GREEN, Colors.YELLOW, Colors.MAGENTA, Colors.GRAY, Colors.RESET)
+        self._colors = palette if color else ('',) * len(palette)
+        self._pending = ''
+        self._string: Optional[List[str]] = None  # pieces of a string still open at the chunk end
+        self._escape = False                      # ...which ended on a lone backslash
+        self._stack: List[list] = []  # [bracket, still empty, elements so far]
+        self._last = ''               # last punctuation, to tell keys from values
+        self._skip: Optional[list] = None  # [mode, bracket, nesting, commas, seen a value]
+        self._decoder = None
+
+    def _end_skip(self, skip: list, close: str, out: Callable[[str], None]):
+        """Write the summary that replaces a skipped region"""
+        gray, reset = self._colors[4], self._colors[5]
+        count = skip[3] + (1 if skip[4] else 0)
+        if skip[0] == 'depth':
+            noun = 'key' if skip[1] == '{' else 'item'
+            summary = f"{gray}... {count} {noun}{'' if count == 1 else 's'}{reset}" if count else ''
+            out(skip[1] + summary + close)
+        else:
+            depth = len(self._stack)
+            out(f",\n{self.indent * depth}{gray}... ({count} more item{'' if count == 1 else 's'}){reset}"
+                f"\n{self.indent * (depth - 1)}{close}")
+            self._stack.pop()
+
+    def _format(self, tokens: List[str], out: Callable[[str], None]):
+        """Write the formatted tokens; raises IndexError with the offending token index"""
+        stack = self._stack
+        indent = self.indent
+        max_items, max_depth = self.max_items, self.max_depth
+        key_color, string_color, number_color, literal_color, _, reset = self._colors
+        last = self._last
+        skip = self._skip
+        
+        for index, value in enumerate(tokens):
+            first = value[0]
+            if skip is not None:
+                if first in '[{':
+                    skip[2] += 1
+                    skip[4] = True
+                elif first in ']}':
+                    if skip[2]:
+                        skip[2] -= 1
+                    else:
+                        self._end_skip(skip, first, out)
+                        skip = None
+                        last = first
+                        if not stack:
+                            out('\n')
+                elif first == ',':
+                    if skip[2] == 0:
+                        skip[3] += 1
+                elif first != ':':
+                    skip[4] = True
+                continue
+            
+            if first == ',':
+                if not stack:
+                    raise IndexError(index)
+                frame = stack[-1]
+                frame[2] += 1
+                if frame[0] == '[' and max_items is not None and frame[2] >= max_items:
+                    skip = ['items', '[', 0, 0, False]
+                    continue
+                out(',\n' + indent * len(stack))
+                last = ','
+            elif first == ':':
+                out(': ')
+                last = ':'
+            elif first in ']}':
+                if not stack or stack[-1][0] != ('[' if first == ']' else '{'):
+                    raise IndexError(index)
+                frame = stack.pop()
+                out(first if frame[1] else '\n' + indent * len(stack) + first)
+                last = first
+                if not stack:
+                    out('\n')
+            else:
+                # A value, or an opening bracket
+                color = ''
+                if stack:
+                    frame = stack[-1]
+                    if frame[1]:
+                        frame[1] = False
+                        out('\n' + indent * len(stack))
+                    if first == '"' and frame[0] == '{' and last in ('{', ','):
+                        color = key_color
+                last = ''
+                if first in '[{':
+                    last = first
+                    if max_depth is not None and len(stack) >= max_depth:
+                        skip = ['depth', first, 0, 0, False]
+                    else:
+                        out(first)
+                        stack.append([first, True, 0])
+                    continue
+                if first == '"':
+                    if len(value) == 1:
+                        raise IndexError(index)
+                    color = color or string_color
+                elif first in '-0123456789':
+                    color = number_color
+                elif value in ('true', 'false', 'null'):
+                    color = literal_color
+                else:
+                    raise IndexError(index)
+                out(color + value + reset if reset else value)
+                if not stack:
+                    out('\n')
+        
+        self._last = last
+        self._skip = skip
+
+    def _scan(self, text: str, final: bool) -> str:
+        """Format as much of text as possible and return the incomplete tail.
+
+        A string left open by the chunk end goes to `_string` instead, so
+        later chunks are only searched for its closing quote.
+        """
+        tokens = []
+        for match in self.TOKENS.finditer(text):
+            token = match.group()
+            tokens.append(token)
+            if token == '"':
+                # Unterminated string: the rest of the text is inside it
+                if not final:
+                    tokens.pop()
+                    opened = text[match.start():]
+                    self._string = [opened]
+                    self._escape = self.STRING_BODY.match(opened, 1).end() == len(opened) - 1
+                break
+        pending = ''
+        if (tokens and not final and self._string is None
+                and tokens[-1][0] not in '"{}[],:' and text.endswith(tokens[-1])):
+            # A number or literal may continue in the next chunk
+            pending = tokens.pop()
+        
+        parts: List[str] = []
+        try:
+            self._format(tokens, parts.append)
+        except IndexError as e:
+            # Pass the rest through from the first token that doesn't fit
+            bad = e.args[0]
+            for index, token in enumerate(self.TOKENS.finditer(text)):
+                if index == bad:
+                    parts.append(text[token.start():])
+                    break
+            self.failed = True
+            self._string = None
+            pending = ''
+        self.out.write(''.join(parts))
+        return pending
+
+    def _continue_string(self, text: str) -> Optional[str]:
+        """Extend the open string with text; once it closes, return it with the rest of text"""
+        start = 0
+        if self._escape:
+            if not text:
+                return None
+            start, self._escape = 1, False
+        end = self.STRING_BODY.match(text, start).end()
+        self._string.append(text)
+        if end >= len(text) - 1 and text[end:] in ('', '\\'):
+            self._escape = end < len(text)
+            return None
+        opened, self._string = ''.join(self._string), None
+        return opened
+
+    def feed(self, text: str):
+        """Format a chunk of JSON text"""
+        if self.failed:
+            self.out.write(text)
+            return
+        if self._string is not None:
+            text = self._continue_string(text)
+            if text is None:
+                return
+        self._pending = self._scan(self._pending + text, final=False)
+
+    def write(self, data: bytes):
+        """Format a chunk of UTF-8 encoded JSON (a make_request body sink)"""
+        if self._decoder is None:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.feed(self._decoder.decode(data))
+
+    def close(self):
+        """Flush any buffered tail; unterminated input is written as-is"""
+        if self._decoder is not None:
+            self.feed(self._decoder.decode(b'', final=True))
+        if self._string is not None:
+            self._pending, self._string = ''.join(self._string), None
+        if self._pending and not self.failed:
+            self._pending = self._scan(self._pending, final=True)
+        if self._stack or self._skip is not None:
+            self.out.write('\n')
+        self.out.flush()
+
+
+def looks_like_json(body: str) -> bool:
+    """True if a body starts like a JSON object or array"""
+    return body.lstrip()[:1] in ('{', '[')
+
+
+def print_json(body: str, out=None, max_items: Optional[int] = None,
+               max_depth: Optional[int] = None):
+    """Pretty-print a JSON body with JsonStreamPrinter, or print it as-is"""
+    out = out or sys.stdout
+    if not looks_like_json(body):
+        print(body, file=out)
+        return
+    printer = JsonStreamPrinter(out, max_items, max_depth, color=out.isatty())
+    for start in range(0, len(body), STREAM_CHUNK_SIZE):
+        printer.feed(body[start:start + STREAM_CHUNK_SIZE])
+    printer.close()
+
+
+def print_status_line(response: Dict[str, Any], out=None):
+    """Print the colored 'status reason' line of a response"""
+    status = response['status']
+    status_color = Colors.GREEN if status < 300 else Colors.YELLOW if status < 400 else Colors.RED
+    print(f"\n{status_color}{Colors.BOLD}{status} {response['reason']}{Colors.RESET}", file=out or sys.stdout)
+
+
+class ResponseStream:
+    """make_request on_response hook that prints JSON bodies while they download.
+
+    start() prints the status line and returns a JsonStreamPrinter sink
+    for JSON content types; other bodies are left to be buffered and
+    printed afterwards. `started` tells the caller which happened.
+    """
+
+    def __init__(self, out, max_items: Optional[int] = None, max_depth: Optional[int] = None):
+        self.out = out
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.printer: Optional[JsonStreamPrinter] = None
+
+    @property
+    def started(self) -> bool:
+        return self.printer is not None
+
+    def start(self, head: Dict[str, Any]) -> Optional[Callable[[bytes], None]]:
+        content_type = _header(head['headers'], 'Content-Type') or ''
+        if 'json' not in content_type.lower():
+            return None
+        print_status_line(head, self.out)
+        print(file=self.out)
+        self.printer = JsonStreamPrinter(self.out, self.max_items, self.max_depth,
+                                         color=self.out.isatty())
+        return self.printer.write
+
+    def close(self):
+        if self.printer is not None:
+            self.printer.close()
+
+
 def print_request_info(method: str, url: str, headers: Dict[str, str], body: Optional[str]):
     """Print formatted request information"""
     print(f"\n{Colors.BOLD}{Colors.BLUE}→ Request{Colors.RESET}")
@@ -137,15 +522,28 @@ def print_request_info(method: str, url: str, headers: Dict[str, str], body: Opt
     
     if body:
         print(f"\n{Colors.GRAY}Body:{Colors.RESET}")
-        try:
-            formatted = json.dumps(json.loads(body), indent=2)
-            print(formatted)
-        except json.JSONDecodeError:
-            print(body)
+        print_json(body)
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Format per-phase milliseconds as 'DNS 1.2ms | Connect 3.4ms | ...'"""
+    labels = {'dns': 'DNS', 'connect': 'Connect', 'tls': 'TLS', 'send': 'Send',
+              'ttfb': 'TTFB', 'transfer': 'Transfer'}
+    return ' | '.join(f"{labels[phase]} {timings.get(phase, 0):.1f}ms" for phase in labels)
+
 
+def format_sizes(size: int, wire_size: Optional[int] = None) -> str:
+    """Format a decoded body size, noting the transferred size when it differs"""
+    if wire_size is None or wire_size == size:
+        return format_size(size)
+    return f"{format_size(size)} ({format_size(wire_size)} transferred)"
 
-def print_response_info(response: urllib.request.http.client.HTTPResponse, 
-                       body: str, duration: float):
+
+def print_response_info(response: 'http.client.HTTPResponse', 
+                       body: str, duration: float, size: Optional[int] = None,
+                       timings: Optional[Dict[str, float]] = None, cache: Optional[str] = None,
+                       wire_size: Optional[int] = None, max_items: Optional[int] = None,
+                       max_depth: Optional[int] = None):
     """Print formatted response information"""
     status_code = response.status
     status_color = Colors.GREEN if 200 <= status_code < 300 else Colors.YELLOW if 300 <= status_code < 400 else Colors.RED
@@ -153,7 +551,13 @@ def print_response_info(response: urllib.request.http.client.HTTPResponse,
     print(f"\n{Colors.BOLD}{Colors.BLUE}← Response{Colors.RESET}")
     print(f"{status_color}{Colors.BOLD}{status_code} {response.reason}{Colors.RESET}")
     print(f"{Colors.GRAY}Time: {format_duration(duration)}{Colors.RESET}")
-    print(f"{Colors.GRAY}Size: {format_size(len(body.encode('utf-8')))}{Colors.RESET}")
+    if timings:
+        print(f"{Colors.GRAY}  {format_timings(timings)}{Colors.RESET}")
+    if size is None:
+        size = len(body.encode('utf-8'))
+    print(f"{Colors.GRAY}Size: {format_sizes(size, wire_size)}{Colors.RESET}")
+    if cache:
+        print(f"{Colors.GRAY}Cache: {cache}{Colors.RESET}")
     
     # Print response headers
     print(f"\n{Colors.GRAY}Headers:{Colors.RESET}")
@@ -162,14 +566,10 @@ def print_response_info(response: urllib.request.http.client.HTTPResponse,
     
     # Print response body
     print(f"\n{Colors.GRAY}Body:{Colors.RESET}")
-    content_type = response.headers.get('Content-Type', '')
+    content_type = _header(dict(response.headers), 'Content-Type') or ''
     
     if 'application/json' in content_type:
-        try:
-            formatted = json.dumps(json.loads(body), indent=2)
-            print(formatted)
-        except json.JSONDecodeError:
-            print(body)
+        print_json(body, max_items=max_items, max_depth=max_depth)
     else:
         # Show first 1000 chars for non-JSON
         if len(body) > 1000:
@@ -179,85 +579,1989 @@ def print_response_info(response: urllib.request.http.client.HTTPResponse,
             print(body)
 
 
+# Read/write size for streamed request and response bodies
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# Request phases recorded by make_request, in milliseconds
+TIMING_PHASES = ('dns', 'connect', 'tls', 'send', 'ttfb', 'transfer')
+
+
+def _elapsed_ms(start_ns: int) -> float:
+    return (time.perf_counter_ns() - start_ns) / 1_000_000
+
+
+def connect_addresses(addresses: List[tuple], timeout, source_address=None) -> 'socket.socket':
+    """Open a TCP connection to the first reachable getaddrinfo() result"""
+    import socket
+    error = None
+    for family, socktype, proto, _, sockaddr in addresses:
+        sock = socket.socket(family, socktype, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            error = e
+            sock.close()
+    raise error or OSError("getaddrinfo returned no addresses")
+
+
+class DnsCache:
+    """getaddrinfo() results cached per (host, port) for `ttl` seconds.
+
+    The stdlib resolver does not expose record TTLs, so every entry lives
+    for the configured ttl (0 disables caching). `overrides` pins hosts to
+    fixed addresses like curl's --resolve and always wins. With `path`,
+    lookups are shared with other invocations through a JSON file.
+    Thread-safe.
+    """
+
+    def __init__(self, ttl: float = 60, path: Optional[Path] = None):
+        self.ttl = ttl
+        self.path = path
+        self.overrides: Dict[tuple, List[tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[tuple, tuple] = {}  # (host, port) -> (expires, addresses)
+        self._lock = threading.Lock()
+        if path is not None:
+            self._load()
+
+    def _load(self):
+        data = load_json(self.path)
+        now = time.time()
+        for item in data.get('entries', []) if isinstance(data, dict) else []:
+            try:
+                key = (item['host'], int(item['port']))
+                expires = float(item['expires'])
+                addresses = [(family, socktype, proto, canonname, tuple(sockaddr))
+                             for family, socktype, proto, canonname, sockaddr in item['addresses']]
+            except (KeyError, TypeError, ValueError):
+                continue
+            if expires > now:
+                self._entries[key] = (expires, addresses)
+
+    def _save(self):
+        now = time.time()
+        entries = [{'host': host, 'port': port, 'expires': expires,
+                    'addresses': [[int(a[0]), int(a[1]), a[2], a[3], list(a[4])] for a in addresses]}
+                   for (host, port), (expires, addresses) in self._entries.items() if expires > now]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({'entries': entries}), encoding='utf-8')
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # The in-memory entry still serves this process
+
+    def _get(self, key: tuple) -> Optional[List[tuple]]:
+        addresses = self.overrides.get(key)
+        if addresses is None:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                addresses = entry[1]
+        return addresses
+
+    def lookup(self, host: str, port: int) -> Optional[List[tuple]]:
+        """Return pinned or still-fresh addresses, or None on a miss"""
+        with self._lock:
+            addresses = self._get((host.lower(), port))
+            if addresses is not None:
+                self.hits += 1
+            return addresses
+
+    def store(self, host: str, port: int, addresses: List[tuple]):
+        """Record a fresh lookup"""
+        with self._lock:
+            self.misses += 1
+            if self.ttl > 0:
+                self._entries[(host.lower(), port)] = (time.time() + self.ttl, list(addresses))
+                if self.path is not None:
+                    self._save()
+
+    def resolve(self, host: str, port: int) -> List[tuple]:
+        """Return addresses for host:port, calling getaddrinfo() on a miss"""
+        addresses = self.lookup(host, port)
+        if addresses is None:
+            import socket
+            addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+            self.store(host, port, addresses)
+        return addresses
+
+    def prefetch(self, urls: List[str], workers: int = 8) -> int:
+        """Resolve the hosts of these URLs in parallel; returns how many were looked up.
+
+        URLs still holding {{VAR}} placeholders are skipped, and lookup
+        errors are left for the request itself to report.
+        """
+        import urllib.parse
+        targets = set()
+        for url in urls:
+            if '{{' in url:
+                continue
+            try:
+                parts = urllib.parse.urlsplit(url)
+                port = parts.port or (443 if parts.scheme.lower() == 'https' else 80)
+            except ValueError:
+                continue
+            if parts.hostname and self._get((parts.hostname.lower(), port)) is None:
+                targets.add((parts.hostname, port))
+        
+        def resolve(target: tuple):
+            try:
+                self.resolve(*target)
+            except OSError:
+                pass
+        
+        if targets:
+            import concurrent.futures
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets)))) as executor:
+                list(executor.map(resolve, targets))
+        return len(targets)
+
+    def counters(self) -> tuple:
+        return self.hits, self.misses
+
+    def entries(self) -> List[tuple]:
+        """(host, port, seconds left, addresses) of every fresh entry"""
+        now = time.time()
+        with self._lock:
+            return sorted((host, port, expires - now, [a[4][0] for a in addresses])
+                          for (host, port), (expires, addresses) in self._entries.items()
+                          if expires > now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            if self.path is not None:
+                with contextlib.suppress(FileNotFoundError):
+                    self.path.unlink()
+
+
+@functools.lru_cache(maxsize=None)
+def _dns_cache_for(mode: str, ttl: float) -> DnsCache:
+    return DnsCache(0 if mode == 'off' else ttl, DNS_FILE if mode == 'disk' else None)
+
+
+def get_dns_cache() -> DnsCache:
+    """Return the process-wide DNS cache configured by RESTCLI_DNS_CACHE.
+
+    'memory' (default) caches for this process, 'disk' also shares lookups
+    through ~/.restcli/dns.json and 'off' resolves every time.
+    RESTCLI_DNS_TTL sets the lifetime in seconds (default 60).
+    """
+    mode = os.environ.get('RESTCLI_DNS_CACHE', 'memory').lower()
+    try:
+        ttl = max(0.0, float(os.environ.get('RESTCLI_DNS_TTL', 60)))
+    except ValueError:
+        ttl = 60.0
+    return _dns_cache_for(mode, ttl)
+
+
+def format_dns_stats(before: tuple) -> str:
+    """Describe DNS cache hits and misses since a counters() snapshot"""
+    hits, misses = get_dns_cache().counters()
+    return f"DNS cache: {hits - before[0]} hits, {misses - before[1]} misses"
+
+
+def parse_resolve(spec: str) -> tuple:
+    """Parse curl-style 'host:port:addr[,addr...]' (IPv6 in brackets) into
+    ((host, port), getaddrinfo-style addresses)"""
+    import socket
+    host, _, rest = spec.partition(':')
+    port, _, addrs = rest.partition(':')
+    if not host or not port.isdigit() or not addrs:
+        raise ValueError(f"Invalid --resolve {spec!r} (expected host:port:address)")
+    port = int(port)
+    addresses = []
+    for addr in addrs.split(','):
+        addr = addr.strip().strip('[]')
+        family = socket.AF_INET6 if ':' in addr else socket.AF_INET
+        try:
+            socket.inet_pton(family, addr)
+        except OSError:
+            raise ValueError(f"Invalid address {addr!r} in --resolve {spec!r}")
+        sockaddr = (addr, port, 0, 0) if family == socket.AF_INET6 else (addr, port)
+        addresses.append((family, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', sockaddr))
+    return (host.lower(), port), addresses
+
+
+@contextlib.contextmanager
+def resolve_overrides(pins: Dict[tuple, List[tuple]]):
+    """Pin hosts (from parse_resolve) in the DNS cache for one command"""
+    if not pins:
+        yield
+        return
+    cache = get_dns_cache()
+    cache.overrides.update(pins)
+    CONNECTION_POOL.close()  # Idle connections may point at the old addresses
+    try:
+        yield
+    finally:
+        cache.overrides.clear()
+        CONNECTION_POOL.close()
+
+
+class _TimedConnectionMixin:
+    """Record DNS, TCP connect and TLS handshake times of each new connection.
+
+    Times land in `phases` (milliseconds); the pool resets it before every
+    request, so a reused connection reports zero for all three.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.phases: Dict[str, float] = {}
+        self._create_connection = self._timed_create_connection
+
+    def _timed_create_connection(self, address, timeout, source_address=None):
+        host, port = address
+        start = time.perf_counter_ns()
+        addresses = get_dns_cache().resolve(host, port)
+        self.phases['dns'] = _elapsed_ms(start)
+        start = time.perf_counter_ns()
+        sock = connect_addresses(addresses, timeout, source_address)
+        self.phases['connect'] = _elapsed_ms(start)
+        return sock
+
+    def connect(self):
+        import http.client
+        start = time.perf_counter_ns()
+        super().connect()
+        if isinstance(self, http.client.HTTPSConnection):
+            handshake = _elapsed_ms(start) - self.phases.get('dns', 0) - self.phases.get('connect', 0)
+            self.phases['tls'] = max(handshake, 0.0)
+
+
+@functools.lru_cache(maxsize=None)
+def _connection_classes() -> tuple:
+    """Define the timed connection classes on first use, importing http.client"""
+    import http.client
+
+    class TimedHTTPConnection(_TimedConnectionMixin, http.client.HTTPConnection):
+        """HTTPConnection that records connection phase timings"""
+
+    class TimedHTTPSConnection(_TimedConnectionMixin, http.client.HTTPSConnection):
+        """HTTPSConnection that records connection phase timings"""
+
+    return TimedHTTPConnection, TimedHTTPSConnection
+
+
+def __getattr__(name: str):
+    """Expose the lazily defined connection classes as module attributes"""
+    if name == 'TimedHTTPConnection':
+        return _connection_classes()[0]
+    if name == 'TimedHTTPSConnection':
+        return _connection_classes()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def system_proxies() -> Dict[str, str]:
+    """Proxy URLs by scheme, as urllib.request.getproxies() finds them.
+
+    That reads the *_proxy environment variables (plus the system settings
+    on macOS and Windows); without any, urllib.request is not imported.
+    """
+    if sys.platform not in ('darwin', 'win32') and not any(
+            name.lower().endswith('_proxy') for name in os.environ):
+        return {}
+    import urllib.request
+    return urllib.request.getproxies()
+
+
+def parse_proxy(proxy: str) -> tuple:
+    """Parse a proxy URL into (host, port, Proxy-Authorization value or None)"""
+    import base64
+    import urllib.parse
+    parts = urllib.parse.urlsplit(proxy if '://' in proxy else f'http://{proxy}')
+    if parts.scheme.lower() != 'http' or not parts.hostname:
+        raise ValueError(f"Unsupported proxy: '{proxy}' (expected http://host:port)")
+    auth = None
+    if parts.username is not None:
+        credentials = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+        auth = 'Basic ' + base64.b64encode(credentials.encode('utf-8')).decode('ascii')
+    return parts.hostname, parts.port or 80, auth
+
+
+class ConnectionPool:
+    """Keep-alive pool of HTTP(S) connections keyed by (scheme, host, port, proxy).
+
+    Requests go through the proxy system_proxies() gives for their scheme
+    unless urllib.request.proxy_bypass() exempts the host (no_proxy): plain
+    HTTP is sent to the proxy with an absolute URL, HTTPS is tunneled with
+    CONNECT.
+    """
+
+    def __init__(self, max_per_host: int = 10, idle_timeout: float = 60.0):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[tuple, List[tuple]] = {}
+        self._lock = threading.Lock()
+        self._ssl_context = None
+        self._proxies: Optional[Dict[str, str]] = None
+        self._proxy_for: Dict[tuple, Optional[tuple]] = {}
+
+    def _proxy(self, scheme: str, host: str) -> Optional[tuple]:
+        """The parse_proxy() tuple to reach this host through, or None; decided once per host"""
+        key = (scheme, host)
+        if key not in self._proxy_for:
+            if self._proxies is None:
+                self._proxies = system_proxies()
+            proxy = self._proxies.get(scheme)
+            if proxy:
+                import urllib.request
+                proxy = None if urllib.request.proxy_bypass(host) else parse_proxy(proxy)
+            self._proxy_for[key] = proxy or None
+        return self._proxy_for[key]
+
+    def _new_connection(self, scheme: str, host: str, port: int, proxy: Optional[tuple],
+                        timeout: float) -> 'http.client.HTTPConnection':
+        http_class, https_class = _connection_classes()
+        connect_host, connect_port = (proxy[0], proxy[1]) if proxy else (host, port)
+        if scheme == 'https':
+            if self._ssl_context is None:
+                import ssl
+                self._ssl_context = ssl.create_default_context()
+            conn = https_class(connect_host, connect_port, timeout=timeout,
+                               context=self._ssl_context,
+                               blocksize=STREAM_CHUNK_SIZE)
+            if proxy:
+                conn.set_tunnel(host, port, headers={'Proxy-Authorization': proxy[2]} if proxy[2] else None)
+        else:
+            conn = http_class(connect_host, connect_port, timeout=timeout,
+                              blocksize=STREAM_CHUNK_SIZE)
+        conn.pool_key = (scheme, host, port, proxy)
+        return conn
+
+    def _acquire(self, key: tuple, timeout: float):
+        """Return (connection, reused), preferring the most recently used idle one"""
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, last_used = idle.pop()
+                if conn.sock is not None and now - last_used < self.idle_timeout:
+                    conn.timeout = timeout
+                    conn.sock.settimeout(timeout)
+                    return conn, True
+                conn.close()
+        return self._new_connection(*key, timeout), False
+
+    def request(self, method: str, url: str, body=None,
+                headers: Optional[Dict[str, str]] = None, timeout: float = 30):
+        """Send a request and return (connection, response) once headers arrive.
+
+        `body` may be bytes or a binary file object, which http.client
+        streams (chunked unless a Content-Length header is given).
+        Phase timings of the exchange are left in `connection.phases`.
+        The caller must read the response and then hand both to release().
+        A reused connection that the server already dropped is retried once
+        on a fresh connection, provided a file body can be rewound; errors
+        on fresh connections propagate.
+        """
+        import http.client
+        import urllib.parse
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: '{parts.scheme}'")
+        if not parts.hostname:
+            raise ValueError(f"Invalid URL: {url}")
+
+        proxy = self._proxy(scheme, parts.hostname)
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == 'https' else 80), proxy)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        if proxy and scheme == 'http':
+            # A plain HTTP proxy takes the absolute URL (Host still names the origin)
+            target = f"http://{parts.netloc.rpartition('@')[2]}{target}"
+            if proxy[2]:
+                headers = dict(headers or {}, **{'Proxy-Authorization': proxy[2]})
+
+        streaming = hasattr(body, 'read')
+        body_start = body.tell() if streaming and body.seekable() else None
+        
+        conn, reused = self._acquire(key, timeout)
+        while True:
+            try:
+                conn.phases = {}
+                start = time.perf_counter_ns()
+                conn.request(method, target, body=body, headers=headers or {})
+                sent = time.perf_counter_ns()
+                response = conn.getresponse()
+                phases = conn.phases
+                setup = phases.get('dns', 0) + phases.get('connect', 0) + phases.get('tls', 0)
+                phases['send'] = max((sent - start) / 1_000_000 - setup, 0.0)
+                phases['ttfb'] = _elapsed_ms(sent)
+                return conn, response
+            except (ConnectionError, http.client.BadStatusLine):
+                conn.close()
+                if not reused or (streaming and body_start is None):
+                    raise
+                if streaming:
+                    body.seek(body_start)
+                conn, reused = self._new_connection(*key, timeout), False
+            except BaseException:
+                conn.close()
+                raise
+
+    def release(self, conn: 'http.client.HTTPConnection',
+                response: 'http.client.HTTPResponse'):
+        """Return a connection to the pool if its response was fully consumed"""
+        if conn.sock is None or response.will_close or not response.isclosed():
+            conn.close()
+            return
+
+        key = conn.pool_key
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_per_host:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            for idle in self._idle.values():
+                for conn, _ in idle:
+                    conn.close()
+            self._idle.clear()
+
+
+# Shared by every command so repeated requests to a host reuse one connection
+CONNECTION_POOL = ConnectionPool()
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10
+
+
+def redirect_method(status: int, method: str) -> Optional[str]:
+    """The method to follow a redirect with, or None to return the response as is.
+
+    Matches urllib: GET and HEAD follow every redirect code, POST follows
+    301/302/303 as a GET, and other methods (or a 307/308 POST) are not
+    redirected. The body is never re-sent.
+    """
+    if status not in REDIRECT_CODES:
+        return None
+    if method in ('GET', 'HEAD'):
+        return method
+    if method == 'POST' and status in (301, 302, 303):
+        return 'GET'
+    return None
+
+
+def _stream_body(response: 'http.client.HTTPResponse', output: BinaryIO, hasher,
+                 progress: Optional[Callable[[int, Optional[int]], None]],
+                 offset: int = 0) -> int:
+    """Copy a response body to output in fixed-size chunks and return bytes written"""
+    length = response.getheader('Content-Length')
+    total = offset + int(length) if length and length.isdigit() else None
+    written = 0
+    while True:
+        chunk = response.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        output.write(chunk)
+        hasher.update(chunk)
+        written += len(chunk)
+        if progress:
+            progress(offset + written, total)
+    output.flush()
+    return written
+
+
+@functools.lru_cache(maxsize=None)
+def _brotli():
+    """Return the optional brotli module, or None if it isn't installed"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def accept_encoding() -> str:
+    """The Accept-Encoding make_request sends; br only when brotli is installed"""
+    return 'gzip, deflate, br' if _brotli() else 'gzip, deflate'
+
+
+class _DeflateDecoder:
+    """'deflate' decoder that accepts raw deflate as well as zlib-wrapped data"""
+
+    def __init__(self):
+        self._obj = zlib.decompressobj()
+        self._started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        if not self._started and data:
+            self._started = True
+            try:
+                return self._obj.decompress(data)
+            except zlib.error:
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._obj.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._obj = _brotli().Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._obj.process(data) if data else b''
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class ContentDecoder:
+    """Incremental decoder for a Content-Encoding header value.
+
+    Codings are undone in reverse order of application, each chunk passing
+    through every stage, so memory use is bounded by the decoded output.
+    """
+
+    def __init__(self, encodings: List[str]):
+        self.encodings = encodings
+        self._stages = []
+        for encoding in reversed(encodings):
+            if encoding == 'br':
+                self._stages.append(_BrotliDecoder())
+            elif encoding == 'deflate':
+                self._stages.append(_DeflateDecoder())
+            else:
+                self._stages.append(zlib.decompressobj(16 + zlib.MAX_WBITS))
+
+    def decompress(self, chunk: bytes) -> bytes:
+        for stage in self._stages:
+            chunk = stage.decompress(chunk)
+        return chunk
+
+    def flush(self) -> bytes:
+        data = b''
+        for stage in self._stages:
+            data = stage.decompress(data) + stage.flush()
+        return data
+
+
+def content_decoder(header: Optional[str]) -> Optional[ContentDecoder]:
+    """Return a decoder for a Content-Encoding value, or None if the body is
+    identity-encoded or uses a coding we can't undo"""
+    encodings = [e.strip().lower() for e in (header or '').split(',')]
+    encodings = [e for e in encodings if e and e != 'identity']
+    supported = ('gzip', 'x-gzip', 'deflate') + (('br',) if _brotli() else ())
+    if not encodings or any(e not in supported for e in encodings):
+        return None
+    return ContentDecoder(encodings)
+
+
+def _read_body(response: 'http.client.HTTPResponse',
+               sink: Optional[Callable[[bytes], None]] = None) -> tuple:
+    """Read and decode a response body; returns (body, bytes on the wire, decoded size).
+
+    With a sink, decoded chunks are handed to it as they arrive and the
+    returned body is empty.
+    """
+    decoder = content_decoder(response.getheader('Content-Encoding'))
+    if decoder is None and sink is None:
+        data = response.read()
+        return data, len(data), len(data)
+    
+    parts = []
+    wire_size = size = 0
+    
+    def emit(data: bytes):
+        nonlocal size
+        size += len(data)
+        if sink is None:
+            parts.append(data)
+        elif data:
+            sink(data)
+    
+    try:
+        while True:
+            chunk = response.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            wire_size += len(chunk)
+            emit(decoder.decompress(chunk) if decoder else chunk)
+        if decoder:
+            emit(decoder.flush())
+    except (zlib.error, ValueError) as e:
+        import http.client
+        raise http.client.HTTPException(f"Cannot decode {', '.join(decoder.encodings)} body: {e}")
+    return b''.join(parts), wire_size, size
+
+
+def _seed_hash(output: BinaryIO, length: int):
+    """Return a sha256 of the first `length` bytes already in a file being resumed"""
+    import hashlib
+    hasher = hashlib.sha256()
+    output.seek(0)
+    remaining = length
+    while remaining > 0:
+        chunk = output.read(min(STREAM_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        hasher.update(chunk)
+        remaining -= len(chunk)
+    return hasher
+
+
+def _header(headers: Dict[str, str], name: str) -> Optional[str]:
+    """Case-insensitive lookup in a plain header dict"""
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into {directive: argument or None}"""
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+class ResponseCache:
+    """On-disk HTTP cache for GET responses, bounded by an LRU byte budget.
+
+    Each entry is a file named by the SHA-256 of method and URL holding
+    one JSON line of metadata followed by the raw body. A response with
+    Vary stores a small pointer there instead, naming the request headers
+    that select the variant; the variant itself is keyed by their values
+    too. Freshness comes from Cache-Control max-age (or Expires); stale
+    entries with an ETag or Last-Modified are revalidated with a
+    conditional request. File mtimes track recency: a hit touches the
+    entry, and storing evicts the least recently used files until the
+    directory fits in `max_bytes`.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, *parts: str) -> Path:
+        import hashlib
+        return self.directory / hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _read(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return {'meta': meta, 'body': body, 'path': path}
+
+    def _write(self, path: Path, meta: Dict[str, Any], body: bytes = b''):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b'\n')
+            f.write(body)
+        os.replace(temp, path)
+
+    def lookup(self, method: str, url: str, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Return the stored entry matching this request, or None"""
+        entry = self._read(self._path(method, url))
+        if entry is not None and 'vary' in entry['meta']:
+            names = entry['meta']['vary']
+            entry = self._read(self._path(method, url, *[_header(headers, n) or '' for n in names]))
+        if entry is None:
+            return None
+        try:
+            os.utime(entry['path'])
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any], headers: Dict[str, str]) -> bool:
+        """True if the entry may be served without asking the server"""
+        request_cc = parse_cache_control(_header(headers, 'Cache-Control'))
+        if 'no-cache' in request_cc or request_cc.get('max-age') == '0':
+            return False
+        return time.time() < entry['meta']['fresh_until']
+
+    def validators(self, entry: Dict[str, Any]) -> Dict[str, str]:
+        """Conditional request headers for revalidating an entry"""
+        meta = entry['meta']
+        conditions = {}
+        if meta.get('etag'):
+            conditions['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            conditions['If-Modified-Since'] = meta['last_modified']
+        return conditions
+
+    @staticmethod
+    def _fresh_until(headers: Dict[str, str], now: float) -> float:
+        import email.utils
+        cc = parse_cache_control(_header(headers, 'Cache-Control'))
+        if 'no-cache' in cc:
+            return now
+        try:
+            if cc.get('max-age') is not None:
+                return now + int(cc['max-age']) - int(_header(headers, 'Age') or 0)
+            expires = _header(headers, 'Expires')
+            if expires:
+                # Measure against the server's Date so clock skew doesn't matter
+                date = _header(headers, 'Date')
+                origin = email.utils.parsedate_to_datetime(date).timestamp() if date else now
+                return now + email.utils.parsedate_to_datetime(expires).timestamp() - origin
+        except (TypeError, ValueError, OverflowError):
+            pass
+        return now
+
+    def store(self, method: str, url: str, request_headers: Dict[str, str], status: int,
+              reason: str, headers: Dict[str, str], charset: Optional[str], body: bytes) -> bool:
+        """Store a response if it is cacheable; returns whether it was stored"""
+        now = time.time()
+        cc = parse_cache_control(_header(headers, 'Cache-Control'))
+        request_cc = parse_cache_control(_header(request_headers, 'Cache-Control'))
+        vary = [name.strip() for name in (_header(headers, 'Vary') or '').split(',') if name.strip()]
+        fresh_until = self._fresh_until(headers, now)
+        etag = _header(headers, 'ETag')
+        last_modified = _header(headers, 'Last-Modified')
+        
+        if (status != 200 or 'no-store' in cc or 'no-store' in request_cc or '*' in vary
+                or len(body) > self.max_bytes
+                or (fresh_until <= now and not etag and not last_modified)):
+            return False
+        
+        meta = {
+            'url': url, 'status': status, 'reason': reason, 'headers': headers,
+            'charset': charset, 'stored': now, 'fresh_until': fresh_until,
+            'etag': etag, 'last_modified': last_modified
+        }
+        path = self._path(method, url)
+        if vary:
+            self._write(path, {'url': url, 'vary': vary})
+            path = self._path(method, url, *[_header(request_headers, n) or '' for n in vary])
+        self._write(path, meta, body)
+        self.evict()
+        return True
+
+    def refresh(self, entry: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        """Apply a 304's headers to an entry and extend its freshness"""
+        meta = entry['meta']
+        updated = {key: value for key, value in meta['headers'].items()
+                   if _header(headers, key) is None}
+        updated.update((key, value) for key, value in headers.items()
+                       if key.lower() not in ('content-length', 'transfer-encoding'))
+        meta.update(headers=updated, fresh_until=self._fresh_until(updated, time.time()),
+                    etag=_header(updated, 'ETag'), last_modified=_header(updated, 'Last-Modified'))
+        self._write(entry['path'], meta, entry['body'])
+        return entry
+
+    def _files(self) -> List[os.DirEntry]:
+        try:
+            return [f for f in os.scandir(self.directory) if f.is_file()]
+        except FileNotFoundError:
+            return []
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its budget"""
+        files = [(f.stat().st_mtime, f.stat().st_size, f.path) for f in self._files()]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        files = self._files()
+        return {'entries': len(files), 'bytes': sum(f.stat().st_size for f in files)}
+
+    def clear(self) -> int:
+        """Delete every entry and return how many files were removed"""
+        files = self._files()
+        for f in files:
+            os.unlink(f.path)
+        return len(files)
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the response cache if RESTCLI_CACHE is enabled, else None.
+
+    RESTCLI_CACHE_MB sets the size budget in megabytes (default 64).
+    """
+    if os.environ.get('RESTCLI_CACHE', '').lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    try:
+        megabytes = max(1, int(os.environ.get('RESTCLI_CACHE_MB', 64)))
+    except ValueError:
+        megabytes = 64
+    return ResponseCache(CACHE_DIR, megabytes * 1024 * 1024)
+
+
+def _decode_body(data: bytes, charset: Optional[str]) -> str:
+    try:
+        return data.decode(charset or 'utf-8', errors='replace')
+    except LookupError:
+        return data.decode('utf-8', errors='replace')
+
+
+def _cached_result(entry: Dict[str, Any], state: str,
+                   timings: Dict[str, float]) -> Dict[str, Any]:
+    """Build a make_request result from a cache entry"""
+    meta = entry['meta']
+    return {
+        'success': True,
+        'status': meta['status'],
+        'reason': meta['reason'],
+        'headers': meta['headers'],
+        'body': _decode_body(entry['body'], meta.get('charset')),
+        'duration': timings['total'] / 1000,
+        'size': len(entry['body']),
+        'wire_size': 0,
+        'timings': timings,
+        'cache': state
+    }
+
+
 def make_request(method: str, url: str, headers: Optional[Dict[str, str]] = None,
-                body: Optional[str] = None, timeout: int = 30) -> Dict[str, Any]:
-    """Make HTTP request and return response details"""
+                body=None, timeout: int = 30,
+                pool: Optional[ConnectionPool] = None,
+                output: Optional[BinaryIO] = None, resume_from: int = 0,
+                progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                cache=None,
+                on_response: Optional[Callable[[Dict[str, Any]], Optional[Callable[[bytes], None]]]] = None,
+                retry: Optional['RetryPolicy'] = None) -> Dict[str, Any]:
+    """Make HTTP request over a pooled connection and return response details.
+
+    `body` may be text, bytes or a binary file object; a file is streamed
+    as the upload (with Content-Length when its size is known, chunked
+    otherwise) and never read into memory. With `output`, a 2xx body is
+    streamed there in STREAM_CHUNK_SIZE chunks instead of being buffered
+    and decoded; the result then carries 'sha256' and 'throughput' and an
+    empty 'body'. `resume_from` asks for the rest of a partial download
+    with a Range header: on 206 the output (opened 'r+b') is appended to,
+    on 200 it is rewritten from the start.
+
+    'timings' holds the milliseconds spent in each of TIMING_PHASES
+    (summed over redirects) plus 'total', measured with perf_counter_ns.
+
+    Buffered responses are requested with accept_encoding() and decoded
+    incrementally as they are read: 'size' is the decoded length and
+    'wire_size' the bytes actually received. Downloads to `output` are
+    requested and saved unencoded so that Range resumes stay valid.
+
+    `on_response` is called with the final response's status, reason and
+    headers as soon as they arrive. If it returns a callable, the decoded
+    body is passed to it chunk by chunk instead of being buffered (the
+    result's 'body' is then empty and 'streamed' is set; a cacheable body
+    is still stored, from a copy kept on the way past). Either way 'body_sha256' is the hash of the decoded body
+    bytes, as downloads have 'sha256' of the bytes saved.
+
+    Plain GETs go through `cache` (a ResponseCache; by default the one
+    enabled by RESTCLI_CACHE, False to bypass it). The result then has a
+    'cache' key: 'hit' when served from disk without a request,
+    'revalidated' when the server answered 304, or 'miss'.
+
+    With `retry`, failed attempts are re-sent as the RetryPolicy allows.
+    A retried result lists every attempt's status or error, duration,
+    timings and the backoff before the next one in 'attempts', and its
+    'duration' covers all attempts. A response already streamed to
+    `on_response`, a non-seekable `output` or an upload that cannot be
+    rewound is never re-sent.
+    """
+    if retry is None:
+        return _request_once(method, url, headers, body, timeout, pool, output,
+                             resume_from, progress, cache, on_response)
+    
+    body_start = body.tell() if hasattr(body, 'read') and body.seekable() else None
+    resendable = ((not hasattr(body, 'read') or body_start is not None)
+                  and (output is None or output.seekable()))
+    attempts: List[Dict[str, Any]] = []
+    streamed = []
+    
+    def watch(head: Dict[str, Any]):
+        # Buffer responses that will be retried; stream only the final one
+        if resendable and retry.retryable(method, len(attempts) + 1, head['status']):
+            return None
+        streamed.append(head['status'])
+        return on_response(head)
+    
+    retry.start()
+    start = time.perf_counter()
+    while True:
+        result = _request_once(method, url, headers, body, timeout, pool, output, resume_from,
+                               progress, cache, watch if on_response is not None else None)
+        attempts.append({key: result[key] for key in ('status', 'error', 'duration', 'timings') if key in result})
+        delay = retry.next_delay(method, len(attempts), result) if resendable and not streamed else None
+        if delay is None:
+            break
+        attempts[-1]['backoff'] = delay
+        time.sleep(delay)
+        if body_start is not None:
+            body.seek(body_start)
+    
+    if len(attempts) > 1:
+        result['attempts'] = attempts
+        result['duration'] = time.perf_counter() - start
+    return result
+
+
+def _request_once(method: str, url: str, headers: Optional[Dict[str, str]], body, timeout,
+                  pool: Optional[ConnectionPool], output: Optional[BinaryIO], resume_from: int,
+                  progress, cache, on_response) -> Dict[str, Any]:
+    """Send one request for make_request(), following redirects"""
+    import hashlib
+    import http.client
+    import urllib.parse
     
     if headers is None:
         headers = {}
     
+    if pool is None:
+        pool = CONNECTION_POOL
+    
+    if cache is None:
+        cache = get_response_cache()
+    
     # Set default headers
     if 'User-Agent' not in headers:
         headers['User-Agent'] = f'RestCLI/{__version__}'
+    if output is None and not _header(headers, 'Accept-Encoding'):
+        headers['Accept-Encoding'] = accept_encoding()
     
     # Prepare request data
     data = None
-    if body:
-        data = body.encode('utf-8')
+    body_start = None
+    send_headers = headers
+    if hasattr(body, 'read'):
+        data = body
+        if 'Content-Type' not in headers:
+            headers['Content-Type'] = 'application/octet-stream'
+        if body.seekable():
+            body_start = body.tell()
+            if 'Content-Length' not in headers:
+                length = os.fstat(body.fileno()).st_size - body_start
+                send_headers = dict(headers, **{'Content-Length': str(length)})
+    elif body:
+        data = body if isinstance(body, bytes) else body.encode('utf-8')
         if 'Content-Type' not in headers:
             headers['Content-Type'] = 'application/json'
     
-    # Create request
-    req = urllib.request.Request(
-        url,
-        data=data,
-        headers=headers,
-        method=method.upper()
-    )
+    method = method.upper()
+    if output is not None and resume_from > 0:
+        send_headers = dict(send_headers, Range=f'bytes={resume_from}-')
+    
+    # Make request (following redirects the way urllib does) and time each phase
+    timings = dict.fromkeys(TIMING_PHASES, 0.0)
+    start_ns = time.perf_counter_ns()
+    
+    cached = None
+    request_url = url
+    cacheable = (cache and method == 'GET' and data is None and output is None
+                 and not _header(headers, 'If-None-Match') and not _header(headers, 'If-Modified-Since'))
+    if cacheable:
+        cached = cache.lookup(method, url, headers)
+        if cached is not None:
+            if cache.is_fresh(cached, headers):
+                timings['total'] = _elapsed_ms(start_ns)
+                return _cached_result(cached, 'hit', timings)
+            send_headers = dict(send_headers, **cache.validators(cached))
     
-    # Make request and measure time
-    start_time = time.time()
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            response_body = response.read().decode('utf-8', errors='replace')
-            duration = time.time() - start_time
+        for _ in range(MAX_REDIRECTS + 1):
+            conn, response = pool.request(method, url, data, send_headers, timeout)
+            for phase, value in conn.phases.items():
+                timings[phase] += value
+            location = response.getheader('Location')
+            redirect = redirect_method(response.status, method) if location else None
+            streamed = None
+            transfer_start = time.perf_counter_ns()
+            try:
+                if output is not None and not redirect and 200 <= response.status < 300:
+                    if response.status == 206 and resume_from > 0:
+                        hasher = _seed_hash(output, resume_from)
+                        output.seek(resume_from)
+                        offset = resume_from
+                    else:
+                        hasher = hashlib.sha256()
+                        offset = 0
+                        if output.seekable():
+                            output.seek(0)
+                            output.truncate()
+                    written = _stream_body(response, output, hasher, progress, offset)
+                    transfer_time = _elapsed_ms(transfer_start) / 1000
+                    streamed = {
+                        'sha256': hasher.hexdigest(),
+                        'throughput': written / transfer_time if transfer_time > 0 else 0.0,
+                        'resumed': offset > 0
+                    }
+                    response_bytes = b''
+                else:
+                    sink = body_hash = kept = None
+                    if (on_response is not None and not redirect
+                            and not (cached is not None and response.status == 304)):
+                        sink = on_response({'status': response.status, 'reason': response.reason,
+                                            'headers': dict(response.headers)})
+                    if sink is not None:
+                        # The body is not kept, so hash it for history on the way past,
+                        # keeping the bytes only for the cache (up to what it would store)
+                        body_hash = hashlib.sha256()
+                        kept = bytearray() if cacheable else None
+                        forward = sink
+                        
+                        def sink(data: bytes):
+                            body_hash.update(data)
+                            if kept is not None and len(kept) <= cache.max_bytes:
+                                kept.extend(data)
+                            forward(data)
+                    response_bytes, wire_size, size = _read_body(response, sink)
+            finally:
+                pool.release(conn, response)
+            timings['transfer'] += _elapsed_ms(transfer_start)
+            
+            if not redirect:
+                break
             
-            return {
-                'success': True,
-                'status': response.status,
-                'reason': response.reason,
-                'headers': dict(response.headers),
-                'body': response_body,
-                'duration': duration,
-                'size': len(response_body.encode('utf-8'))
-            }
-    
-    except urllib.error.HTTPError as e:
-        duration = time.time() - start_time
-        error_body = e.read().decode('utf-8', errors='replace')
+            url = urllib.parse.urljoin(url, location)
+            if data is not None:
+                data = None
+                send_headers = {k: v for k, v in send_headers.items()
+                                if k.lower() not in ('content-type', 'content-length')}
+            method = redirect
+        else:
+            raise http.client.HTTPException(f"Too many redirects (>{MAX_REDIRECTS})")
         
-        return {
-            'success': False,
-            'status': e.code,
-            'reason': e.reason,
-            'headers': dict(e.headers),
-            'body': error_body,
-            'duration': duration,
-            'size': len(error_body.encode('utf-8'))
-        }
-    
-    except urllib.error.URLError as e:
-        duration = time.time() - start_time
-        return {
-            'success': False,
-            'error': str(e.reason),
-            'duration': duration
+        timings['total'] = _elapsed_ms(start_ns)
+        if cached is not None and response.status == 304 and url == request_url:
+            return _cached_result(cache.refresh(cached, dict(response.headers)), 'revalidated', timings)
+        
+        result = {
+            'success': 200 <= response.status < 300,
+            'status': response.status,
+            'reason': response.reason,
+            'headers': dict(response.headers),
+            'body': '',
+            'duration': timings['total'] / 1000,
+            'size': written if streamed else size,
+            'wire_size': written if streamed else wire_size,
+            'timings': timings
         }
+        if streamed:
+            result.update(streamed)
+        else:
+            charset = response.headers.get_content_charset()
+            result['body'] = _decode_body(response_bytes, charset)
+            if body_hash is not None:
+                result['body_sha256'] = body_hash.hexdigest()
+                result['streamed'] = True
+            else:
+                result['body_sha256'] = hashlib.sha256(response_bytes).hexdigest()
+            if cacheable:
+                if url == request_url:
+                    cache.store(
+                        method, url, headers, response.status, response.reason,
+                        result['headers'], charset, response_bytes if kept is None else bytes(kept))
+                result['cache'] = 'miss'
+        return result
     
     except Exception as e:
-        duration = time.time() - start_time
+        timings['total'] = _elapsed_ms(start_ns)
         return {
             'success': False,
             'error': str(e),
-            'duration': duration
+            'transient': isinstance(e, _transient_errors()),
+            'duration': timings['total'] / 1000,
+            'timings': timings
         }
 
 
-def save_to_history(method: str, url: str, headers: Dict[str, str],
-                   body: Optional[str], response: Dict[str, Any]):
-    """Save request to history"""
-    history = load_json(HISTORY_FILE)
+def _transient_errors() -> tuple:
+    """Exception types worth retrying: network failures and truncated responses"""
+    import http.client
+    return (OSError, http.client.IncompleteRead, http.client.BadStatusLine)
+
+
+class RetryPolicy:
+    """When and how long to wait before re-sending a failed request.
+
+    Transient errors (see _transient_errors) and `statuses` are retried up
+    to `retries` times, for idempotent methods only unless `unsafe`. The
+    wait before retry n is uniform over [0, min(max_backoff, backoff * 2**(n-1))]
+    ("full jitter"), or the response's Retry-After when it has one; a
+    Retry-After above `max_retry_after` is not waited for. The retry
+    budget allows `reserve` retries plus `budget` (a fraction) of the
+    requests started, so a failing host sees at most that much extra load.
+    One policy is shared by all requests of a run; it is thread-safe.
+    """
+    IDEMPOTENT = ('GET', 'HEAD', 'OPTIONS', 'TRACE', 'PUT', 'DELETE')
+    STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, retries: int = 3, backoff: float = 0.2, max_backoff: float = 10.0,
+                 budget: float = 0.2, reserve: int = 10, unsafe: bool = False,
+                 statuses: tuple = STATUSES, max_retry_after: float = 60.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.reserve = reserve
+        self.unsafe = unsafe
+        self.statuses = statuses
+        self.max_retry_after = max_retry_after
+        self.requests = 0
+        self.retried = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Count a new request towards the retry budget"""
+        with self._lock:
+            self.requests += 1
+
+    def retryable(self, method: str, attempt: int, status: Optional[int] = None) -> bool:
+        """Whether attempt number `attempt` ending in `status` (None: a transient error) may be retried"""
+        if attempt > self.retries:
+            return False
+        if not self.unsafe and method.upper() not in self.IDEMPOTENT:
+            return False
+        return status is None or status in self.statuses
+
+    def next_delay(self, method: str, attempt: int, result: Dict[str, Any]) -> Optional[float]:
+        """Seconds to wait before retrying this attempt's result, or None to stop"""
+        if 'error' in result:
+            if not result.get('transient') or not self.retryable(method, attempt):
+                return None
+        elif not self.retryable(method, attempt, result.get('status')):
+            return None
+        
+        retry_after = parse_retry_after(_header(result.get('headers') or {}, 'Retry-After'))
+        if retry_after is not None and retry_after > self.max_retry_after:
+            return None
+        with self._lock:
+            if self.retried >= self.reserve + self.budget * self.requests:
+                self.denied += 1
+                return None
+            self.retried += 1
+        if retry_after is not None:
+            return retry_after
+        import random
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def summary(self) -> str:
+        """One line of retry counts for the run summary"""
+        with self._lock:
+            text = f"Retries: {self.retried} for {self.requests} requests"
+            if self.denied:
+                text += f", {self.denied} refused by the retry budget"
+            return text
+
+
+def retry_policy_from_args(args) -> Optional[RetryPolicy]:
+    """Build the RetryPolicy asked for by --retries and friends, if any"""
+    if not getattr(args, 'retries', 0):
+        return None
+    return RetryPolicy(args.retries, args.retry_backoff, budget=args.retry_budget / 100,
+                       unsafe=args.retry_unsafe)
+
+
+class AsyncRequestEngine:
+    """asyncio transport that multiplexes many requests on one thread.
+
+    Speaks HTTP/1.1 over asyncio.open_connection with keep-alive reuse per
+    (scheme, host, port). At most max_in_flight requests are outstanding at
+    once; request() returns the same result dict as make_request, except
+    that the TLS handshake is counted in the 'connect' timing.
+    """
+
+    def __init__(self, max_in_flight: int = 100, max_per_host: int = 10,
+                 idle_timeout: float = 60.0):
+        self.max_in_flight = max_in_flight
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[tuple, List[tuple]] = {}
+        self._semaphore = None
+        self._ssl_context = None
+
+    async def _open(self, key: tuple, phases: Dict[str, float]):
+        """Resolve and connect, recording 'dns' and 'connect' (which includes TLS)"""
+        import asyncio
+        import socket
+        scheme, host, port = key
+        ssl_context = None
+        if scheme == 'https':
+            if self._ssl_context is None:
+                import ssl
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        
+        start = time.perf_counter_ns()
+        dns = get_dns_cache()
+        addresses = dns.lookup(host, port)
+        if addresses is None:
+            addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            dns.store(host, port, addresses)
+        phases['dns'] = _elapsed_ms(start)
+        
+        start = time.perf_counter_ns()
+        error = None
+        for _, _, _, _, sockaddr in addresses:
+            try:
+                connection = await asyncio.open_connection(
+                    sockaddr[0], sockaddr[1], ssl=ssl_context,
+                    server_hostname=host if ssl_context else None)
+                phases['connect'] = _elapsed_ms(start)
+                return connection
+            except OSError as e:
+                error = e
+        raise error or OSError("getaddrinfo returned no addresses")
+
+    async def _acquire(self, key: tuple, phases: Dict[str, float]):
+        """Return (reader, writer, reused), preferring an idle connection"""
+        now = time.monotonic()
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if (now - last_used < self.idle_timeout and not writer.is_closing()
+                    and not reader.at_eof()):
+                return reader, writer, True
+            writer.close()
+        reader, writer = await self._open(key, phases)
+        return reader, writer, False
+
+    def _release(self, key: tuple, reader, writer):
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.max_per_host:
+            idle.append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+
+    @staticmethod
+    async def _read_response(reader, method: str, phases: Dict[str, float], sent_ns: int):
+        """Parse one HTTP/1.1 response and return (status, reason, headers, body, keep_alive)"""
+        import http.client
+        while True:
+            status_line = await reader.readline()
+            phases.setdefault('ttfb', _elapsed_ms(sent_ns))
+            if not status_line:
+                raise http.client.RemoteDisconnected("Remote end closed connection without response")
+            parts = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+            if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+                raise http.client.BadStatusLine(status_line)
+            version, status = parts[0], int(parts[1])
+            reason = parts[2] if len(parts) > 2 else ''
+            
+            headers: Dict[str, str] = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers.setdefault(name.strip(), value.strip())
+            # Skip interim 1xx responses such as 100 Continue
+            if status >= 200 or status == 101:
+                break
+        
+        lower = {name.lower(): value.lower() for name, value in headers.items()}
+        connection = lower.get('connection', '')
+        keep_alive = ('close' not in connection if version == 'HTTP/1.1'
+                      else 'keep-alive' in connection)
+        
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            return status, reason, headers, b'', keep_alive
+        
+        if 'chunked' in lower.get('transfer-encoding', ''):
+            chunks = []
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            return status, reason, headers, b''.join(chunks), keep_alive
+        
+        if 'content-length' in lower:
+            body = await reader.readexactly(int(lower['content-length']))
+            return status, reason, headers, body, keep_alive
+        
+        return status, reason, headers, await reader.read(), False
+
+    async def _exchange(self, method: str, url: str, headers: Dict[str, str],
+                        data: Optional[bytes], timings: Dict[str, float]):
+        import asyncio
+        import http.client
+        import urllib.parse
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: '{parts.scheme}'")
+        if not parts.hostname:
+            raise ValueError(f"Invalid URL: {url}")
+        
+        default_port = 443 if scheme == 'https' else 80
+        key = (scheme, parts.hostname, parts.port or default_port)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        
+        host = f'[{parts.hostname}]' if ':' in parts.hostname else parts.hostname
+        if parts.port and parts.port != default_port:
+            host = f'{host}:{parts.port}'
+        
+        lines = [f'{method} {target} HTTP/1.1']
+        names = {name.lower() for name in headers}
+        if 'host' not in names:
+            lines.append(f'Host: {host}')
+        if 'accept-encoding' not in names:
+            lines.append('Accept-Encoding: identity')
+        if 'content-length' not in names and (data is not None or method in ('POST', 'PUT', 'PATCH')):
+            lines.append(f'Content-Length: {len(data or b"")}')
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (data or b'')
+        
+        phases: Dict[str, float] = {}
+        reader, writer, reused = await self._acquire(key, phases)
+        while True:
+            try:
+                start = time.perf_counter_ns()
+                writer.write(payload)
+                await writer.drain()
+                sent = time.perf_counter_ns()
+                phases['send'] = (sent - start) / 1_000_000
+                status, reason, response_headers, body, keep_alive = \
+                    await self._read_response(reader, method, phases, sent)
+                phases['transfer'] = _elapsed_ms(sent) - phases['ttfb']
+                break
+            except (ConnectionError, http.client.BadStatusLine, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                phases = {}
+                (reader, writer), reused = await self._open(key, phases), False
+            except BaseException:
+                writer.close()
+                raise
+        
+        for phase, value in phases.items():
+            timings[phase] += value
+        if keep_alive:
+            self._release(key, reader, writer)
+        else:
+            writer.close()
+        return status, reason, response_headers, body
+
+    async def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                      body: Optional[str] = None, timeout: float = 30) -> Dict[str, Any]:
+        """Make an HTTP request and return response details like make_request"""
+        import asyncio
+        import http.client
+        import urllib.parse
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        
+        headers = dict(headers or {})
+        if 'User-Agent' not in headers:
+            headers['User-Agent'] = f'RestCLI/{__version__}'
+        
+        data = None
+        if body:
+            data = body.encode('utf-8')
+            if 'Content-Type' not in headers:
+                headers['Content-Type'] = 'application/json'
+        
+        method = method.upper()
+        async with self._semaphore:
+            timings = dict.fromkeys(TIMING_PHASES, 0.0)
+            start_ns = time.perf_counter_ns()
+            # `timeout` bounds the whole request, redirects included
+            deadline = time.monotonic() + timeout
+            try:
+                for _ in range(MAX_REDIRECTS + 1):
+                    status, reason, response_headers, response_bytes = await asyncio.wait_for(
+                        self._exchange(method, url, headers, data, timings),
+                        max(deadline - time.monotonic(), 0))
+                    
+                    location = response_headers.get('Location')
+                    redirect = redirect_method(status, method) if location else None
+                    if not redirect:
+                        break
+                    
+                    url = urllib.parse.urljoin(url, location)
+                    if data is not None:
+                        data = None
+                        headers = {k: v for k, v in headers.items()
+                                   if k.lower() not in ('content-type', 'content-length')}
+                    method = redirect
+                else:
+                    raise http.client.HTTPException(f"Too many redirects (>{MAX_REDIRECTS})")
+                
+                timings['total'] = _elapsed_ms(start_ns)
+                return {
+                    'success': 200 <= status < 300,
+                    'status': status,
+                    'reason': reason,
+                    'headers': response_headers,
+                    'body': response_bytes.decode('utf-8', errors='replace'),
+                    'duration': timings['total'] / 1000,
+                    'size': len(response_bytes),
+                    'timings': timings
+                }
+            
+            except asyncio.TimeoutError:
+                timings['total'] = _elapsed_ms(start_ns)
+                return {
+                    'success': False,
+                    'error': 'timed out',
+                    'duration': timings['total'] / 1000,
+                    'timings': timings
+                }
+            
+            except Exception as e:
+                timings['total'] = _elapsed_ms(start_ns)
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'duration': timings['total'] / 1000,
+                    'timings': timings
+                }
+
+    async def run(self, requests: List[Dict[str, Any]], timeout: float = 30) -> List[Dict[str, Any]]:
+        """Send request dicts (method/url/headers/body) concurrently; results keep input order"""
+        import asyncio
+        return await asyncio.gather(*(
+            self.request(r['method'], r['url'], r.get('headers'), r.get('body'), timeout)
+            for r in requests
+        ))
+
+    def close(self):
+        """Close every idle connection"""
+        for idle in self._idle.values():
+            for _, writer, _ in idle:
+                writer.close()
+        self._idle.clear()
+
+
+def make_requests_async(requests: List[Dict[str, Any]], max_in_flight: int = 100,
+                        timeout: float = 30) -> List[Dict[str, Any]]:
+    """Run many requests on one thread with the asyncio engine and return their results"""
+    import asyncio
+    
+    async def run_all():
+        engine = AsyncRequestEngine(max_in_flight, max_per_host=max_in_flight)
+        try:
+            return await engine.run(requests, timeout)
+        finally:
+            engine.close()
+    
+    return asyncio.run(run_all())
+
+
+class TokenBucket:
+    """Allow `rate` events per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    import email.utils
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class _HostLimit:
+    """Limiter state of one host"""
+
+    def __init__(self, limit: float, bucket: Optional[TokenBucket]):
+        self.limit = limit
+        self.peak = limit
+        self.low = limit
+        self.in_flight = 0
+        self.bucket = bucket
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.waited = 0.0
+
+
+class RateLimiter:
+    """Per-host token buckets and AIMD concurrency for multi-request runs.
+
+    Each host gets a token bucket of `rate` requests per second (if set)
+    and, with `adaptive`, a concurrency limit that starts at
+    `max_concurrency`, halves on a 429/503 and grows by 1/limit per
+    success, like TCP congestion control. Only one decrease happens per
+    round trip: throttled responses to requests sent before the last
+    decrease are ignored. A Retry-After on those responses pauses the
+    host until it has passed.
+    """
+    THROTTLE_STATUSES = (429, 503)
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[float] = None,
+                 max_concurrency: int = 8, adaptive: bool = False):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.adaptive = adaptive
+        self._hosts: Dict[str, _HostLimit] = {}
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        import urllib.parse
+        return urllib.parse.urlsplit(url).netloc.lower()
+
+    def _host(self, host: str) -> _HostLimit:
+        state = self._hosts.get(host)
+        if state is None:
+            bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+            state = self._hosts[host] = _HostLimit(self.max_concurrency, bucket)
+        return state
+
+    def try_acquire(self, url: str, since: Optional[float] = None) -> tuple:
+        """Return (0, ticket) when the request may go now, else (seconds to wait, None).
+
+        `since` is the time.monotonic() at which the caller started waiting.
+        """
+        host = self.host_of(url)
+        with self._cond:
+            state = self._host(host)
+            now = time.monotonic()
+            if state.paused_until > now:
+                return state.paused_until - now, None
+            if self.adaptive and state.in_flight >= int(state.limit):
+                return self.POLL_INTERVAL, None
+            if state.bucket is not None:
+                wait = state.bucket.take(now)
+                if wait:
+                    return wait, None
+            state.in_flight += 1
+            if since is not None:
+                state.waited += now - since
+            return 0.0, (host, now)
+
+    def acquire(self, url: str) -> tuple:
+        """Block until a request to url may be sent; returns a ticket for release()"""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                wait, ticket = self.try_acquire(url, start)
+                if ticket is not None:
+                    return ticket
+                self._cond.wait(wait)
+
+    def release(self, ticket: tuple, response: Optional[Dict[str, Any]]):
+        """Record how a request went and let waiting requests proceed"""
+        host, sent = ticket
+        status = (response or {}).get('status')
+        with self._cond:
+            state = self._host(host)
+            state.in_flight -= 1
+            now = time.monotonic()
+            if status in self.THROTTLE_STATUSES:
+                state.throttled += 1
+                delay = parse_retry_after(_header((response or {}).get('headers') or {}, 'Retry-After'))
+                if delay:
+                    state.paused_until = max(state.paused_until, now + delay)
+                if self.adaptive and sent >= state.last_decrease:
+                    state.limit = max(1.0, state.limit / 2)
+                    state.low = min(state.low, state.limit)
+                    state.last_decrease = now
+            elif self.adaptive and status is not None:
+                state.limit = min(float(self.max_concurrency), state.limit + 1 / state.limit)
+            self._cond.notify_all()
+
+    def request(self, method: str, url: str, *args, **kwargs) -> Dict[str, Any]:
+        """make_request() once the limiter admits it"""
+        ticket = self.acquire(url)
+        response = None
+        try:
+            response = make_request(method, url, *args, **kwargs)
+            return response
+        finally:
+            self.release(ticket, response)
+
+    def summary(self) -> List[str]:
+        """One line per host that was throttled or made to wait"""
+        lines = []
+        with self._cond:
+            for host, state in sorted(self._hosts.items()):
+                if not state.throttled and state.waited < 0.001 and state.low == self.max_concurrency:
+                    continue
+                line = f"{host}: {state.throttled} throttled, waited {format_duration(state.waited)}"
+                if self.adaptive:
+                    line += f", concurrency {self.max_concurrency} -> min {int(state.low)} -> {int(state.limit)}"
+                lines.append(line)
+        return lines
+
+
+def rate_limiter_from_args(args, max_concurrency: int) -> Optional[RateLimiter]:
+    """Build the RateLimiter asked for by --rate-limit/--burst/--adaptive, if any"""
+    if not (args.rate_limit or args.adaptive):
+        return None
+    return RateLimiter(args.rate_limit, args.burst, max_concurrency, args.adaptive)
+
+
+def print_rate_limit_summary(limiter: Optional[RateLimiter], file=None):
+    if limiter is None:
+        return
+    for line in limiter.summary():
+        print(f"{Colors.GRAY}Rate limit {line}{Colors.RESET}", file=file)
+
+
+def history_limit() -> int:
+    """Return how many history entries to retain (RESTCLI_HISTORY_LIMIT, default 100)"""
+    try:
+        return max(1, int(os.environ.get('RESTCLI_HISTORY_LIMIT', 100)))
+    except ValueError:
+        return 100
+
+
+class HistoryStore:
+    """Append-only JSONL request log with a sidecar index of byte offsets.
+
+    Each entry is one line of the log; the index holds the starting offset
+    of every line as a little-endian uint64, so the Nth most recent entry
+    is a single seek away however long the log grows. Writers append under
+    an exclusive file lock. Once the log holds twice `limit` entries it is
+    compacted down to the newest `limit` in a background thread.
+    """
+    OFFSET = struct.Struct('<Q')
+
+    def __init__(self, log_path: Path, index_path: Path, limit: int = 100):
+        self.log_path = log_path
+        self.index_path = index_path
+        self.lock_path = log_path.with_suffix('.lock')
+        self.limit = limit
+        self._compactor: Optional[threading.Thread] = None
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool = True):
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _count(self) -> int:
+        try:
+            return self.index_path.stat().st_size // self.OFFSET.size
+        except FileNotFoundError:
+            return 0
+
+    def __len__(self) -> int:
+        return min(self._count(), self.limit)
+
+    def append(self, entry: Dict[str, Any]):
+        """Append one entry, scheduling compaction if the log is over budget"""
+        line = (json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._locked():
+            with open(self.log_path, 'ab') as log_file, open(self.index_path, 'ab') as index_file:
+                offset = log_file.seek(0, os.SEEK_END)
+                log_file.write(line)
+                index_file.write(self.OFFSET.pack(offset))
+            count = self._count()
+        
+        if count > 2 * self.limit and not (self._compactor and self._compactor.is_alive()):
+            self._compactor = threading.Thread(target=self.compact, name='history-compactor')
+            self._compactor.start()
+
+    def _offsets(self, start: int, stop: int) -> List[int]:
+        with open(self.index_path, 'rb') as index_file:
+            index_file.seek(start * self.OFFSET.size)
+            data = index_file.read((stop - start) * self.OFFSET.size)
+        return [offset for (offset,) in self.OFFSET.iter_unpack(data)]
+
+    def _read(self, start: int, stop: int, count: int) -> List[Dict[str, Any]]:
+        """Read entries start..stop-1 of `count`; the caller holds the lock"""
+        start, stop = max(0, start), min(stop, count)
+        if start >= stop:
+            return []
+        entries = []
+        with open(self.log_path, 'rb') as log_file:
+            for offset in self._offsets(start, stop):
+                log_file.seek(offset)
+                try:
+                    entries.append(json.loads(log_file.readline()))
+                except ValueError:
+                    continue
+        return entries
+
+    def range(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Return raw log entries start..stop-1, oldest first, ignoring `limit`"""
+        with self._locked(exclusive=False):
+            return self._read(start, stop, self._count())
+
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        """Return the newest n (at most `limit`) entries, oldest first"""
+        # Count and read under one lock, so a compaction cannot move the offsets in between
+        with self._locked(exclusive=False):
+            count = self._count()
+            return self._read(count - min(n, self.limit), count, count)
+
+    def get(self, number: int) -> Optional[Dict[str, Any]]:
+        """Return the entry `number` places from the end (1 = most recent)"""
+        if number < 1:
+            return None
+        entries = self.tail(number)
+        return entries[0] if len(entries) == number else None
+
+    def compact(self):
+        """Rewrite the log and index keeping only the newest `limit` entries"""
+        with self._locked():
+            count = self._count()
+            if count <= self.limit:
+                return
+            offsets = self._offsets(count - self.limit, count)
+            base = offsets[0]
+            
+            tmp_log = self.log_path.with_suffix('.jsonl.tmp')
+            tmp_index = self.index_path.with_suffix('.idx.tmp')
+            with open(self.log_path, 'rb') as src, open(tmp_log, 'wb') as dst:
+                src.seek(base)
+                while True:
+                    chunk = src.read(1 << 20)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+            with open(tmp_index, 'wb') as dst:
+                dst.write(b''.join(self.OFFSET.pack(offset - base) for offset in offsets))
+            
+            os.replace(tmp_log, self.log_path)
+            os.replace(tmp_index, self.index_path)
+
+    def migrate_legacy(self, legacy_file: Path):
+        """Import a legacy history.json list once, keeping it as history.json.bak"""
+        if not legacy_file.exists() or self.log_path.exists():
+            return
+        entries = load_json(legacy_file)
+        if isinstance(entries, list):
+            for entry in entries[-self.limit:]:
+                self.append(entry)
+        legacy_file.replace(legacy_file.with_suffix('.json.bak'))
+
+
+class SqliteHistoryStore:
+    """SQLite history backend with indexed filters and aggregate queries.
+
+    Holds the same entries as HistoryStore, plus timestamp, host, path,
+    method and status columns (all indexed) so that `history query` can
+    push filtering and aggregation down into SQL.
+    """
+    GROUP_COLUMNS = ('host', 'path', 'method', 'status')
+
+    def __init__(self, db_path: Path, limit: int = 100):
+        import sqlite3
+        self.db_path = db_path
+        self.limit = limit
+        self._conn = sqlite3.connect(str(db_path), timeout=10, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ts REAL NOT NULL,
+                    method TEXT NOT NULL,
+                    host TEXT,
+                    path TEXT,
+                    status INTEGER,
+                    duration REAL,
+                    size INTEGER,
+                    entry TEXT NOT NULL
+                )""")
+            for column in ('ts',) + self.GROUP_COLUMNS:
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_history_{column} ON history({column})")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM history").fetchone()
+        return min(count, self.limit)
+
+    def append(self, entry: Dict[str, Any]):
+        """Insert one entry and drop rows that fall outside the retention limit"""
+        import urllib.parse
+        from datetime import datetime
+        parts = urllib.parse.urlsplit(entry.get('url', ''))
+        response = entry.get('response') or {}
+        try:
+            ts = datetime.fromisoformat(entry['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            ts = time.time()
+        
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO history (ts, method, host, path, status, duration, size, entry) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, entry.get('method', 'GET'), parts.hostname, parts.path or '/',
+                 response.get('status'), response.get('duration'), response.get('size'),
+                 json.dumps(entry, ensure_ascii=False, separators=(',', ':'))))
+            self._conn.execute("DELETE FROM history WHERE id <= ?",
+                               (cursor.lastrowid - self.limit,))
+
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        """Return the newest n (at most `limit`) entries, oldest first"""
+        with self._lock:
+            rows = self._conn.execute("SELECT entry FROM history ORDER BY id DESC LIMIT ?",
+                                      (min(n, self.limit),)).fetchall()
+        return [json.loads(entry) for (entry,) in reversed(rows)]
+
+    def get(self, number: int) -> Optional[Dict[str, Any]]:
+        """Return the entry `number` places from the end (1 = most recent)"""
+        if not 1 <= number <= self.limit:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT entry FROM history ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                     (number - 1,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, method: Optional[str] = None, host: Optional[str] = None,
+              path: Optional[str] = None, min_status: Optional[int] = None,
+              max_status: Optional[int] = None, since: Optional[float] = None,
+              group_by: Optional[str] = None, percentile: float = 95,
+              limit: int = 100) -> List[Any]:
+        """Filter history in SQL, optionally aggregating per group.
+
+        `path` accepts SQL LIKE wildcards (%). `since` is an age in seconds.
+        Without group_by, returns matching entries newest first. With it,
+        returns dicts of group, count, errors, avg, p (the requested
+        percentile, nearest-rank) and max duration, busiest groups first.
+        """
+        clauses, params = [], []
+        if method:
+            clauses.append("method = ?")
+            params.append(method.upper())
+        if host:
+            clauses.append("host = ?")
+            params.append(host.lower())
+        if path:
+            clauses.append("path LIKE ?")
+            params.append(path)
+        if min_status is not None:
+            clauses.append("status >= ?")
+            params.append(min_status)
+        if max_status is not None:
+            clauses.append("status <= ?")
+            params.append(max_status)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(time.time() - since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        
+        if group_by is None:
+            sql = f"SELECT entry FROM history {where} ORDER BY id DESC LIMIT ?"
+            with self._lock:
+                rows = self._conn.execute(sql, params + [limit]).fetchall()
+            return [json.loads(entry) for (entry,) in rows]
+        
+        if group_by not in self.GROUP_COLUMNS:
+            raise ValueError(f"Cannot group by '{group_by}'")
+        sql = f"""
+            WITH ranked AS (
+                SELECT {group_by} AS grp, status, duration,
+                       ROW_NUMBER() OVER (PARTITION BY {group_by} ORDER BY duration) AS rn,
+                       COUNT(*) OVER (PARTITION BY {group_by}) AS cnt
+                FROM history {where}
+            )
+            SELECT grp, COUNT(*),
+                   SUM(CASE WHEN status IS NULL OR status >= 400 THEN 1 ELSE 0 END),
+                   AVG(duration),
+                   MIN(CASE WHEN rn >= cnt * ? / 100.0 THEN duration END),
+                   MAX(duration)
+            FROM ranked GROUP BY grp ORDER BY COUNT(*) DESC LIMIT ?"""
+        with self._lock:
+            rows = self._conn.execute(sql, params + [percentile, limit]).fetchall()
+        return [dict(zip(('group', 'count', 'errors', 'avg', 'p', 'max'), row)) for row in rows]
+
+    def import_entries(self, entries: List[Dict[str, Any]]):
+        """Copy entries into an empty database, e.g. when switching backends"""
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM history").fetchone()
+        if count == 0:
+            for entry in entries:
+                self.append(entry)
+
+    def close(self):
+        self._conn.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _sqlite_history_store(db_path: Path, log_path: Path, index_path: Path) -> SqliteHistoryStore:
+    """Open a SQLite history once per process, seeded from the JSONL log; closed at exit"""
+    import atexit
+    db_store = SqliteHistoryStore(db_path, history_limit())
+    if log_path.exists():
+        store = HistoryStore(log_path, index_path, history_limit())
+        db_store.import_entries(store.tail(store.limit))
+    atexit.register(db_store.close)
+    return db_store
+
+
+def get_history_store():
+    """Return the request history store selected by RESTCLI_HISTORY_BACKEND.
+
+    'jsonl' (default) is the append-only log; 'sqlite' enables
+    `history query`. The SQLite database is seeded from the log the first
+    time it is created, and its connection is shared by every caller in
+    the process (including daemon commands) instead of opened per save.
+    """
+    store = HistoryStore(HISTORY_LOG, HISTORY_INDEX, history_limit())
+    store.migrate_legacy(HISTORY_FILE)
+    if os.environ.get('RESTCLI_HISTORY_BACKEND', 'jsonl').lower() != 'sqlite':
+        return store
     
+    db_store = _sqlite_history_store(HISTORY_DB, HISTORY_LOG, HISTORY_INDEX)
+    db_store.limit = history_limit()
+    return db_store
+
+
+def save_to_history(method: str, url: str, headers: Dict[str, str],
+                   body: Optional[str], response: Dict[str, Any],
+                   upload_file: Optional[str] = None):
+    """Append request to history; streamed uploads are recorded by file path"""
+    from datetime import datetime
     entry = {
         'timestamp': datetime.now().isoformat(),
         'method': method.upper(),
@@ -267,78 +2571,1215 @@ def save_to_history(method: str, url: str, headers: Dict[str, str],
         'response': {
             'status': response.get('status'),
             'duration': response.get('duration'),
-            'size': response.get('size')
+            'size': response.get('size'),
+            'wire_size': response.get('wire_size'),
+            'timings': response.get('timings')
         }
     }
+    if upload_file:
+        entry['upload_file'] = upload_file
+    if response.get('attempts'):
+        entry['response']['attempts'] = response['attempts']
+    digest = response.get('sha256') or response.get('body_sha256')
+    body = response.get('body')
+    if digest and (response.get('sha256') or response.get('streamed')):
+        body = None  # Saved to a file or streamed, so not stored
+    elif body is not None:
+        blobs = get_blob_store()
+        digest = blobs.put(body, digest) if blobs else digest or body_digest(body)
+    if digest:
+        entry['response']['body_sha256'] = digest
     
-    history.append(entry)
+    get_history_store().append(entry)
+
+
+def body_digest(body: str) -> str:
+    """sha256 of a decoded response body, as recorded in history"""
+    import hashlib
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+class BlobStore:
+    """Content-addressed store of zlib-compressed response bodies.
+
+    A body lives at <directory>/<sha[:2]>/<sha[2:]>, keyed by the sha256
+    of its bytes (body_digest() unless given), so identical responses are
+    stored once.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest[2:]
+
+    def put(self, body: str, digest: Optional[str] = None) -> str:
+        """Store a body and return its digest"""
+        digest = digest or body_digest(body)
+        path = self._path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(zlib.compress(body.encode('utf-8')))
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        try:
+            return zlib.decompress(self._path(digest).read_bytes()).decode('utf-8')
+        except (OSError, zlib.error):
+            return None
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """Return the body store if RESTCLI_STORE_BODIES is enabled, else None"""
+    if os.environ.get('RESTCLI_STORE_BODIES', '').lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    return BlobStore(BLOB_DIR)
+
+
+def compile_ignore(patterns: Optional[List[str]]) -> Optional['re.Pattern']:
+    """Compile diff ignore paths such as 'meta.updated_at', 'items[*].id' or '**.etag'.
+
+    '*' matches one key, '[*]' any index and '**' any run of segments.
+    """
+    if not patterns:
+        return None
+    regexes = []
+    for pattern in patterns:
+        regex = re.escape(pattern.strip())
+        regex = regex.replace(r'\*\*', '\0').replace(r'\[\*\]', r'\[\d+\]')
+        regex = regex.replace(r'\*', r'[^.\[]+').replace('\0', '.*')
+        regexes.append(regex)
+    return re.compile('|'.join(f'(?:{regex})' for regex in regexes) + r'\Z')
+
+
+def json_diff(old: Any, new: Any, ignore: Optional['re.Pattern'] = None) -> List[tuple]:
+    """Structurally diff two parsed JSON values.
+
+    Returns (path, kind, old, new) tuples with kind 'changed', 'added' or
+    'removed' and paths like 'items[3].name'. Equal subtrees are skipped
+    with C-level comparisons before descending, so the walk only visits
+    the branches that actually differ. Values must have the same JSON type
+    to be equal, so true is not 1, but 1 and 1.0 are the same number.
+    Paths matching `ignore` are skipped.
+    """
+    def same(a: Any, b: Any) -> bool:
+        if type(a) is type(b) or (type(a) in (int, float) and type(b) in (int, float)):
+            if isinstance(a, (dict, list)):
+                # == alone would let true match 1 somewhere inside
+                return a == b and json.dumps(a) == json.dumps(b)
+            return a == b
+        return False
     
-    # Keep only last 100 entries
-    if len(history) > 100:
-        history = history[-100:]
+    changes = []
+    # (path, old, new, kind): kind is None for a pair still to compare
+    stack = [('', old, new, None)]
+    while stack:
+        path, a, b, kind = stack.pop()
+        if ignore is not None and path and ignore.match(path):
+            continue
+        if kind is not None:
+            changes.append((path, kind, a, b))
+            continue
+        if same(a, b):
+            continue
+        if isinstance(a, dict) and isinstance(b, dict):
+            children = [(f"{path}.{key}" if path else str(key), a.get(key), b.get(key),
+                         'removed' if key not in b else 'added' if key not in a else None)
+                        for key in list(a) + [key for key in b if key not in a]]
+        elif isinstance(a, list) and isinstance(b, list):
+            children = [(f"{path}[{index}]", a[index] if index < len(a) else None,
+                         b[index] if index < len(b) else None,
+                         'removed' if index >= len(b) else 'added' if index >= len(a) else None)
+                        for index in range(max(len(a), len(b)))]
+        else:
+            changes.append((path, 'changed', a, b))
+            continue
+        # Pushed in reverse so changes come out in document order
+        stack.extend(reversed(children))
+    return changes
+
+
+def diff_bodies(old: str, new: str, ignore: Optional['re.Pattern'] = None) -> List[tuple]:
+    """Diff two response bodies: identical text first, then JSON structure.
+
+    Bodies that are not both JSON are reported as one change at the root.
+    """
+    if old == new:
+        return []
+    try:
+        return json_diff(json.loads(old), json.loads(new), ignore)
+    except ValueError:
+        return [('', 'changed', f"<{len(old)} chars>", f"<{len(new)} chars>")]
+
+
+def diff_recorded(digest: Optional[str], body: Optional[str],
+                  ignore: Optional['re.Pattern'] = None,
+                  body_sha256: Optional[str] = None) -> Optional[List[tuple]]:
+    """Diff a body against the recorded one with this digest.
+
+    `body_sha256` is the hash of the new body's bytes, which is what
+    downloads and streamed responses record; without it the decoded body
+    is hashed. A matching digest needs no diff at all. Returns None when
+    nothing was recorded; if only the digest was kept (as for downloads),
+    a mismatch is one root change between the two hashes.
+    """
+    if digest is None or body is None:
+        return None
+    if digest == (body_sha256 or body_digest(body)):
+        return []
+    recorded = BlobStore(BLOB_DIR).get(digest)
+    if recorded is None:
+        return [('', 'changed', f"<body not stored, sha256 {digest[:12]}>",
+                 f"<{len(body)} chars, sha256 {(body_sha256 or body_digest(body))[:12]}>")]
+    return diff_bodies(recorded, body, ignore)
+
+
+def format_diff(changes: List[tuple], limit: int = 10) -> List[str]:
+    """Render json_diff changes as colored '+', '-' and '~' lines"""
+    def short(value: Any) -> str:
+        text = value if isinstance(value, str) and value.startswith('<') else json.dumps(value, ensure_ascii=False)
+        return text if len(text) <= 60 else text[:57] + '...'
     
-    save_json(HISTORY_FILE, history)
+    lines = []
+    for path, kind, old, new in changes[:limit]:
+        path = path or '(body)'
+        if kind == 'added':
+            lines.append(f"{Colors.GREEN}+ {path}: {short(new)}{Colors.RESET}")
+        elif kind == 'removed':
+            lines.append(f"{Colors.RED}- {path}: {short(old)}{Colors.RESET}")
+        else:
+            lines.append(f"{Colors.YELLOW}~ {path}: {short(old)} -> {short(new)}{Colors.RESET}")
+    if len(changes) > limit:
+        lines.append(f"{Colors.GRAY}... and {len(changes) - limit} more changes{Colors.RESET}")
+    return lines
 
 
-def cmd_request(args):
-    """Execute HTTP request"""
-    ensure_data_dirs()
+class LatencyHistogram:
+    """Fixed-memory latency histogram with HDR-style log-linear buckets.
+
+    Values are recorded in microseconds. Each power-of-two range above
+    2 * SUB_BUCKETS us is split into SUB_BUCKETS linear buckets, so the
+    relative error stays under 1/SUB_BUCKETS however many samples arrive.
+    """
+    SUB_BUCKET_BITS = 6
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    MAX_BITS = 37  # ~38 hours in microseconds
+
+    def __init__(self):
+        self.counts = [0] * ((self.MAX_BITS - self.SUB_BUCKET_BITS + 1) * self.SUB_BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < 2 * self.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - self.SUB_BUCKET_BITS - 1
+        return (shift + 1) * self.SUB_BUCKETS + (value >> shift) - self.SUB_BUCKETS
+
+    def _highest_value(self, index: int) -> int:
+        if index < 2 * self.SUB_BUCKETS:
+            return index
+        shift = index // self.SUB_BUCKETS - 1
+        return ((index % self.SUB_BUCKETS + self.SUB_BUCKETS) << shift) + (1 << shift) - 1
+
+    def record(self, seconds: float):
+        """Record one latency sample given in seconds"""
+        value = min(max(int(seconds * 1_000_000), 0), (1 << self.MAX_BITS) - 1)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add the samples of another histogram to this one"""
+        for i, n in enumerate(other.counts):
+            if n:
+                self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> float:
+        """Return the latency in seconds at or below which pct% of samples fall"""
+        if not self.count:
+            return 0.0
+        target = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self._highest_value(i), self.max) / 1_000_000
+        return self.max / 1_000_000
+
+    def mean(self) -> float:
+        """Return the mean latency in seconds"""
+        return self.total / self.count / 1_000_000 if self.count else 0.0
+
+
+class _BenchSchedule:
+    """Hands out send times to bench workers until the run is over"""
+
+    def __init__(self, total: Optional[int], duration: Optional[float],
+                 rps: Optional[float]):
+        self.total = total
+        self.rps = rps
+        self.issued = 0
+        self.start = time.perf_counter()
+        self.deadline = self.start + duration if duration else None
+        self._lock = threading.Lock()
+
+    def next_slot(self) -> Optional[float]:
+        """Return the perf_counter time to send the next request, or None when done"""
+        with self._lock:
+            now = time.perf_counter()
+            if self.total is not None and self.issued >= self.total:
+                return None
+            if self.deadline is not None and now >= self.deadline:
+                return None
+            slot = self.start + self.issued / self.rps if self.rps else now
+            if self.deadline is not None and slot >= self.deadline:
+                return None
+            self.issued += 1
+            return slot
+
+
+class _BenchStats:
+    """Per-worker bench counters, merged once the run finishes"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.statuses: Dict[Any, int] = {}
+        self.errors = 0
+        self.phase_totals = dict.fromkeys(TIMING_PHASES, 0.0)
+
+    def add(self, response: Dict[str, Any]):
+        self.histogram.record(response['duration'])
+        key = response.get('status', 'ERR')
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if not response['success']:
+            self.errors += 1
+        for phase, value in (response.get('timings') or {}).items():
+            if phase in self.phase_totals:
+                self.phase_totals[phase] += value
+
+    def merge(self, other: '_BenchStats'):
+        self.histogram.merge(other.histogram)
+        for key, n in other.statuses.items():
+            self.statuses[key] = self.statuses.get(key, 0) + n
+        self.errors += other.errors
+        for phase, value in other.phase_totals.items():
+            self.phase_totals[phase] += value
+
+
+def run_bench(request: Dict[str, Any], concurrency: int = 10,
+              total: Optional[int] = None, duration: Optional[float] = None,
+              rps: Optional[float] = None, timeout: int = 30,
+              engine: str = 'thread', limiter: Optional['RateLimiter'] = None,
+              retry: Optional[RetryPolicy] = None) -> Dict[str, Any]:
+    """Fire a request repeatedly from concurrent workers and collect statistics.
+
+    Stops after `total` requests or `duration` seconds, whichever comes
+    first. With `rps`, sends are paced to that aggregate rate. The
+    'thread' engine uses worker threads over a ConnectionPool; 'async'
+    runs the workers as coroutines on an AsyncRequestEngine. A `limiter`
+    further holds requests back per host, and `retry` re-sends failures.
+    """
+    dns_before = get_dns_cache().counters()
+    get_dns_cache().prefetch([request['url']])
+    schedule = _BenchSchedule(total, duration, rps)
+    workers: List[_BenchStats] = []
     
-    # Load environment variables
-    env = load_json(ENV_FILE)
+    if engine == 'async':
+        import asyncio
+        
+        async def async_worker(client: AsyncRequestEngine, stats: _BenchStats):
+            while True:
+                slot = schedule.next_slot()
+                if slot is None:
+                    break
+                delay = slot - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                stats.add(await async_request(client))
+        
+        async def async_attempt(client: AsyncRequestEngine) -> Dict[str, Any]:
+            if limiter is None:
+                return await client.request(request['method'], request['url'],
+                                            request['headers'], request['body'], timeout)
+            start = time.monotonic()
+            wait, ticket = limiter.try_acquire(request['url'], start)
+            while ticket is None:
+                await asyncio.sleep(wait)
+                wait, ticket = limiter.try_acquire(request['url'], start)
+            response = None
+            try:
+                response = await client.request(request['method'], request['url'],
+                                                request['headers'], request['body'], timeout)
+                return response
+            finally:
+                limiter.release(ticket, response)
+        
+        async def async_request(client: AsyncRequestEngine) -> Dict[str, Any]:
+            if retry is None:
+                return await async_attempt(client)
+            retry.start()
+            start = time.perf_counter()
+            attempts = []
+            while True:
+                response = await async_attempt(client)
+                attempts.append({key: response[key] for key in ('status', 'error', 'duration') if key in response})
+                delay = retry.next_delay(request['method'], len(attempts), response)
+                if delay is None:
+                    break
+                attempts[-1]['backoff'] = delay
+                await asyncio.sleep(delay)
+            if len(attempts) > 1:
+                response = dict(response, attempts=attempts, duration=time.perf_counter() - start)
+            return response
+        
+        async def run_async():
+            client = AsyncRequestEngine(concurrency, max_per_host=concurrency)
+            workers.extend(_BenchStats() for _ in range(concurrency))
+            try:
+                await asyncio.gather(*(async_worker(client, stats) for stats in workers))
+            finally:
+                client.close()
+        
+        asyncio.run(run_async())
+    else:
+        pool = ConnectionPool(max_per_host=concurrency)
+        
+        def worker(stats: _BenchStats):
+            while True:
+                slot = schedule.next_slot()
+                if slot is None:
+                    break
+                delay = slot - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                send = limiter.request if limiter is not None else make_request
+                stats.add(send(request['method'], request['url'],
+                               dict(request['headers']), request['body'],
+                               timeout, pool=pool, retry=retry))
+        
+        workers.extend(_BenchStats() for _ in range(concurrency))
+        threads = [threading.Thread(target=worker, args=(stats,), daemon=True)
+                   for stats in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.close()
     
+    elapsed = time.perf_counter() - schedule.start
+    combined = _BenchStats()
+    for stats in workers:
+        combined.merge(stats)
+    
+    count = combined.histogram.count
+    return {
+        'requests': count,
+        'errors': combined.errors,
+        'elapsed': elapsed,
+        'statuses': combined.statuses,
+        'histogram': combined.histogram,
+        'phase_means': {phase: total / count if count else 0.0
+                        for phase, total in combined.phase_totals.items()},
+        'dns': format_dns_stats(dns_before),
+        'rate_limit': limiter.summary() if limiter is not None else [],
+        'retries': retry.summary() if retry is not None else None
+    }
+
+
+def load_collection(name: str, data: Any) -> List[Dict[str, Any]]:
+    """Return the steps of a collection file.
+
+    A collection is either a single saved request (the original format)
+    or {"requests": [...]}, where each step may carry a "name", a
+    "depends_on" list and an "extract" map of VAR -> response path.
+    """
+    if isinstance(data, dict) and isinstance(data.get('requests'), list):
+        steps = data['requests']
+    elif isinstance(data, dict) and 'url' in data:
+        steps = [dict(data, name=data.get('name', name))]
+    else:
+        raise ValueError(f"Collection '{name}' has no requests")
+    
+    for i, step in enumerate(steps, 1):
+        step.setdefault('name', f'step{i}')
+        step.setdefault('method', 'GET')
+        if 'url' not in step:
+            raise ValueError(f"Step '{step['name']}' has no url")
+    names = [step['name'] for step in steps]
+    if len(set(names)) != len(names):
+        raise ValueError("Step names must be unique")
+    return steps
+
+
+def _step_variables(step: Dict[str, Any]) -> set:
+    """Return the {{VAR}} names a step's url, headers and body refer to"""
+    texts = [step['url']] + list((step.get('headers') or {}).values())
+    if isinstance(step.get('body'), str):
+        texts.append(step['body'])
+    names = set()
+    for text in texts:
+        if '{{' in text:
+            names |= compile_template(text).variables
+    return names
+
+
+def collection_dependencies(steps: List[Dict[str, Any]]) -> Dict[str, set]:
+    """Map each step to the steps it waits for.
+
+    Dependencies are the explicit "depends_on" names plus any step whose
+    "extract" provides a variable this step uses. Raises ValueError for
+    unknown names and cycles.
+    """
+    providers = {}
+    for step in steps:
+        for var in (step.get('extract') or {}):
+            providers.setdefault(var, step['name'])
+    
+    names = {step['name'] for step in steps}
+    deps = {}
+    for step in steps:
+        wanted = set(step.get('depends_on') or [])
+        unknown = wanted - names
+        if unknown:
+            raise ValueError(f"Step '{step['name']}' depends on unknown step(s): {', '.join(sorted(unknown))}")
+        wanted |= {providers[var] for var in _step_variables(step) if var in providers}
+        wanted.discard(step['name'])
+        deps[step['name']] = wanted
+    
+    # Kahn's algorithm: anything left unvisited sits on a cycle
+    remaining = {name: len(wanted) for name, wanted in deps.items()}
+    ready = [name for name, n in remaining.items() if n == 0]
+    while ready:
+        done = ready.pop()
+        for name, wanted in deps.items():
+            if done in wanted:
+                remaining[name] -= 1
+                if remaining[name] == 0:
+                    ready.append(name)
+    cyclic = sorted(name for name, n in remaining.items() if n > 0)
+    if cyclic:
+        raise ValueError(f"Dependency cycle between steps: {', '.join(cyclic)}")
+    return deps
+
+
+def extract_value(response: Dict[str, Any], path: str) -> Optional[str]:
+    """Pull a value out of a response by path.
+
+    'status', 'headers.Name' or 'body.items[0].id' (dotted keys and list
+    indexes into the JSON body). Returns None if the path does not match.
+    """
+    if path == 'status':
+        return None if response.get('status') is None else str(response['status'])
+    if path.startswith('headers.'):
+        wanted = path[len('headers.'):].lower()
+        for key, value in (response.get('headers') or {}).items():
+            if key.lower() == wanted:
+                return value
+        return None
+    if path != 'body' and not path.startswith('body.') and not path.startswith('body['):
+        return None
+    
+    try:
+        value = json.loads(response.get('body') or '')
+    except json.JSONDecodeError:
+        return response.get('body') if path == 'body' else None
+    for key, index in re.findall(r'\.([^.\[\]]+)|\[(\d+)\]', path[len('body'):]):
+        try:
+            value = value[int(index)] if index else value[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def run_collection(steps: List[Dict[str, Any]], env: Dict[str, str], workers: int = 8,
+                   timeout: int = 30,
+                   on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   limiter: Optional[RateLimiter] = None,
+                   retry: Optional[RetryPolicy] = None) -> List[Dict[str, Any]]:
+    """Execute collection steps as a DAG on a worker pool.
+
+    Steps whose dependencies are satisfied run in parallel; each finished
+    step's "extract" values are layered over `env` for the steps after it.
+    Dependents of a failed step are skipped. Returns one result per step
+    in collection order; on_result is called as each one completes.
+    Requests go through `limiter` and are re-sent per `retry` if given.
+    """
+    import concurrent.futures
+    deps = collection_dependencies(steps)
+    by_name = {step['name']: step for step in steps}
+    variables: Dict[str, str] = {}
+    results: Dict[str, Dict[str, Any]] = {}
+    pool = ConnectionPool(max_per_host=workers)
+    get_dns_cache().prefetch([replace_env_vars(step['url'], env) for step in steps], workers)
+    
+    def execute(step: Dict[str, Any], scope: Dict[str, str]) -> Dict[str, Any]:
+        missing = set()
+        url = replace_env_vars(step['url'], scope, missing)
+        headers = {key: replace_env_vars(str(value), scope, missing)
+                   for key, value in (step.get('headers') or {}).items()}
+        body = step.get('body')
+        if isinstance(body, str):
+            body = replace_env_vars(body, scope, missing)
+        elif body is not None:
+            body = json.dumps(body)
+        send = limiter.request if limiter is not None else make_request
+        response = send(step['method'], url, headers, body, timeout, pool=pool, retry=retry)
+        return {'name': step['name'], 'method': step['method'].upper(), 'url': url,
+                'unresolved': sorted(missing), 'response': response}
+    
+    def finish(result: Dict[str, Any]):
+        results[result['name']] = result
+        if on_result:
+            on_result(result)
+    
+    def skip(name: str, reason: str):
+        step = by_name[name]
+        finish({'name': name, 'method': step['method'].upper(), 'url': step['url'],
+                'skipped': reason, 'response': None})
+    
+    waiting = {name: set(wanted) for name, wanted in deps.items()}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        
+        def submit_ready():
+            for name in [n for n, wanted in waiting.items() if not wanted]:
+                del waiting[name]
+                scope = dict(env)
+                scope.update(variables)
+                running[executor.submit(execute, by_name[name], scope)] = name
+        
+        submit_ready()
+        while running:
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = future.result()
+                finish(result)
+                response = result['response']
+                
+                if response.get('success'):
+                    for var, path in (by_name[name].get('extract') or {}).items():
+                        value = extract_value(response, path)
+                        if value is not None:
+                            variables[var] = value
+                    for wanted in waiting.values():
+                        wanted.discard(name)
+                else:
+                    # Skip everything downstream of a failed step
+                    failed = [name]
+                    while failed:
+                        upstream = failed.pop()
+                        for dependent in [n for n, wanted in waiting.items() if upstream in wanted]:
+                            del waiting[dependent]
+                            skip(dependent, f"dependency '{upstream}' failed")
+                            failed.append(dependent)
+            submit_ready()
+    pool.close()
+    
+    return [results[step['name']] for step in steps]
+
+
+# Columns of --format csv records; timings are flattened into one column per phase
+RECORD_FIELDS = ('method', 'url', 'status', 'duration', 'size', 'wire_size', 'sha256') + \
+    TIMING_PHASES + ('cache', 'attempts', 'error', 'body')
+
+
+def response_record(method: str, url: str, response: Dict[str, Any],
+                    body: bool = False) -> Dict[str, Any]:
+    """One compact --format record of a request's outcome.
+
+    Works for live results and for history entries alike. The body is
+    included verbatim, never re-serialized, and only if `body` is set.
+    """
+    record = {'method': method.upper(), 'url': url, 'status': response.get('status'),
+              'duration': round(response['duration'], 6) if response.get('duration') is not None else None}
+    for key in ('size', 'wire_size'):
+        if response.get(key) is not None:
+            record[key] = response[key]
+    digest = response.get('sha256') or response.get('body_sha256')
+    if digest is None and response.get('body') is not None:
+        digest = body_digest(response['body'])
+    if digest:
+        record['sha256'] = digest
+    if response.get('timings'):
+        record['timings'] = {phase: round(ms, 3) for phase, ms in response['timings'].items()}
+    if response.get('cache'):
+        record['cache'] = response['cache']
+    if response.get('attempts'):
+        record['attempts'] = len(response['attempts'])
+    if 'error' in response:
+        record['error'] = response['error']
+    elif body and response.get('body') is not None:
+        record['body'] = response['body']
+    return record
+
+
+class RecordWriter:
+    """Streams --format records to a text file as JSONL, CSV or raw bodies.
+
+    JSONL is one compact JSON object per line. CSV starts with a header of
+    `fields`, with timings flattened into a column per phase. Raw writes
+    only each record's body, newline-terminated. Every record is flushed
+    so that a pipeline sees results as they complete.
+    """
+
+    def __init__(self, fmt: str, out, fields: tuple = RECORD_FIELDS):
+        self.format = fmt
+        self.out = out
+        self.fields = fields
+        self._csv = None
+
+    def write(self, record: Dict[str, Any]):
+        if self.format == 'raw':
+            body = record.get('body')
+            if not body:
+                return
+            self.out.write(body if body.endswith('\n') else body + '\n')
+        elif self.format == 'csv':
+            if self._csv is None:
+                import csv
+                self._csv = csv.DictWriter(self.out, self.fields, extrasaction='ignore',
+                                           lineterminator='\n')
+                self._csv.writeheader()
+            if record.get('timings'):
+                record = dict(record, **record['timings'])
+            self._csv.writerow(record)
+        else:
+            self.out.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.out.flush()
+
+
+def data_rows(lines: Iterable[str], csv_format: bool = False) -> Iterator[tuple]:
+    """Yield (row number, row) from CSV or JSONL parameter lines, one at a time.
+
+    CSV takes its field names from the header line; JSONL is one JSON
+    object per line, blank lines skipped. A line that cannot be parsed is
+    yielded as a ValueError instead of a dict, so one bad row does not end
+    a long run.
+    """
+    if csv_format:
+        import csv
+        yield from enumerate(csv.DictReader(lines), 1)
+        return
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, ValueError(f"row {number}: invalid JSON ({e.msg})")
+            continue
+        if not isinstance(row, dict):
+            yield number, ValueError(f"row {number}: expected a JSON object")
+            continue
+        yield number, row
+
+
+def row_variables(row: Dict[str, Any]) -> Dict[str, str]:
+    """Template variables for a data row: its fields, plus the whole row as {{_row}}.
+
+    Non-string values are JSON-encoded, so {{tags}} renders as ["a", "b"]
+    and {{_row}} can be used as a request body as-is.
+    """
+    variables = {key: value if isinstance(value, str) else json.dumps(value)
+                 for key, value in row.items() if key is not None}
+    variables['_row'] = json.dumps(row)
+    return variables
+
+
+def fan_out(requests: Iterable[Dict[str, Any]], concurrency: int = 8, timeout: float = 30,
+            limiter: Optional[RateLimiter] = None,
+            retry: Optional[RetryPolicy] = None) -> Iterator[Dict[str, Any]]:
+    """Send a stream of requests on a worker pool, yielding results as they complete.
+
+    Each request has 'method', 'url', 'headers' and 'body'; its result is
+    the request with 'response' added. Requests carrying an 'error' are
+    yielded as they are, unsent. At most 2 * concurrency requests are
+    taken from `requests` ahead of the responses, so an iterator of any
+    length is sent in constant memory. Results that are ready are yielded
+    before the next request is taken, so a slow (e.g. paced) iterator
+    still streams its results.
+    """
+    import concurrent.futures
+    pool = ConnectionPool(max_per_host=concurrency)
+    send = limiter.request if limiter is not None else make_request
+    
+    def execute(request: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.monotonic()
+        response = send(request['method'], request['url'], request['headers'], request['body'],
+                        timeout, pool=pool, retry=retry)
+        return dict(request, response=response, started=started)
+    
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            for request in requests:
+                if 'error' in request:
+                    yield request
+                    continue
+                pending.add(executor.submit(execute, request))
+                if len(pending) >= 2 * concurrency:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                else:
+                    done = {future for future in pending if future.done()}
+                    pending -= done
+                for future in done:
+                    yield future.result()
+            for future in concurrent.futures.as_completed(pending):
+                yield future.result()
+    finally:
+        pool.close()
+
+
+def fan_out_record(result: Dict[str, Any], body: bool = False) -> Dict[str, Any]:
+    """The results record of one fan_out result: its row number and response_record"""
+    record = {'row': result.get('row')}
+    if result.get('response') is None:
+        record['error'] = result['error']
+        return record
+    record.update(response_record(result['method'], result['url'], result['response'], body))
+    if result.get('unresolved'):
+        record['unresolved'] = result['unresolved']
+    return record
+
+
+# Request headers a HAR replay leaves to the connection and make_request
+HAR_SKIPPED_HEADERS = {'host', 'content-length', 'connection', 'keep-alive', 'transfer-encoding',
+                       'accept-encoding', 'upgrade', 'te'}
+
+
+def har_timings(timings: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """HAR 1.2 timings (ms) from restcli phase timings; HAR's connect includes TLS"""
+    if not timings:
+        return {'blocked': -1, 'dns': -1, 'connect': -1, 'ssl': -1, 'send': 0, 'wait': 0, 'receive': 0}
+    tls = timings.get('tls', 0.0)
+    return {
+        'blocked': -1,
+        'dns': round(timings.get('dns', -1), 3),
+        'connect': round(timings['connect'] + tls, 3) if 'connect' in timings else -1,
+        'ssl': round(tls, 3) if tls else -1,
+        'send': round(timings.get('send', 0), 3),
+        'wait': round(timings.get('ttfb', 0), 3),
+        'receive': round(timings.get('transfer', 0), 3),
+    }
+
+
+def history_to_har(entry: Dict[str, Any], blobs: Optional[BlobStore] = None) -> Dict[str, Any]:
+    """One history entry as a HAR 1.2 entry, with the body if `blobs` has it"""
+    import urllib.parse
+    from datetime import datetime
+    response = entry.get('response') or {}
+    headers = entry.get('headers') or {}
+    request = {
+        'method': entry['method'], 'url': entry['url'], 'httpVersion': 'HTTP/1.1',
+        'cookies': [], 'headers': [{'name': k, 'value': str(v)} for k, v in headers.items()],
+        'queryString': [{'name': k, 'value': v} for k, v in
+                        urllib.parse.parse_qsl(urllib.parse.urlsplit(entry['url']).query, keep_blank_values=True)],
+        'headersSize': -1, 'bodySize': 0,
+    }
+    body = entry.get('body')
+    if body is not None:
+        request['bodySize'] = len(body.encode('utf-8'))
+        request['postData'] = {'mimeType': _header(headers, 'Content-Type') or '', 'text': body}
+    content = {'size': response.get('size') or 0, 'mimeType': ''}
+    digest = response.get('body_sha256')
+    text = blobs.get(digest) if blobs is not None and digest else None
+    if text is not None:
+        content['text'] = text
+    duration = response.get('duration')
+    return {
+        'startedDateTime': datetime.fromisoformat(entry['timestamp']).astimezone().isoformat(),
+        'time': round(duration * 1000, 3) if duration is not None else 0,
+        'request': request,
+        'response': {
+            'status': response.get('status') or 0, 'statusText': '', 'httpVersion': 'HTTP/1.1',
+            'cookies': [], 'headers': [], 'content': content, 'redirectURL': '',
+            'headersSize': -1, 'bodySize': response.get('wire_size') if response.get('wire_size') is not None else -1,
+        },
+        'cache': {},
+        'timings': har_timings(response.get('timings')),
+    }
+
+
+def _har_started(entry: Dict[str, Any]) -> Optional[float]:
+    """A HAR entry's startedDateTime as a POSIX timestamp, or None"""
+    from datetime import datetime
+    try:
+        return datetime.fromisoformat(entry['startedDateTime']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def iter_har_entries(stream, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield the log.entries of a HAR file one at a time, without loading the file.
+
+    Text up to the "entries" key of the top-level "log" object is scanned
+    for nesting and strings only; each entry is then decoded with
+    JSONDecoder.raw_decode as its text arrives, so memory is bounded by the
+    largest single entry. Raises ValueError if no entries array is found
+    or an entry is malformed.
+    """
+    decoder = json.JSONDecoder()
+    buf = stream.read(chunk_size)
+    pos = depth = 0
+    in_string = escape = False
+    string_start = 0
+    last_string = None
+    while True:
+        if pos == len(buf):
+            more = stream.read(chunk_size)
+            if not more:
+                raise ValueError('no log.entries array found')
+            buf += more
+        ch = buf[pos]
+        pos += 1
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+                last_string = buf[string_start:pos - 1]
+        elif ch == '"':
+            in_string = True
+            string_start = pos
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+        elif ch == ':' and depth == 2 and last_string == 'entries':
+            break
+    
+    buf = buf[pos:]
+    pos = 0
+    opened = False
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (opened and buf[pos] == ',')):
+            pos += 1
+        if pos == len(buf):
+            more = stream.read(chunk_size)
+            if not more:
+                raise ValueError('log.entries is not terminated')
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        if not opened:
+            if buf[pos] != '[':
+                raise ValueError('log.entries is not an array')
+            opened = True
+            pos += 1
+            continue
+        if buf[pos] == ']':
+            return
+        try:
+            entry, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Most likely cut off mid-entry: read at least as much again and retry
+            buf = buf[pos:]
+            pos = 0
+            more = stream.read(max(chunk_size, len(buf)))
+            if not more:
+                raise ValueError('log.entries ends inside an entry')
+            buf += more
+            continue
+        if not isinstance(entry, dict):
+            raise ValueError('log.entries holds a non-object')
+        yield entry
+        pos = end
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+
+def har_request(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The request of a HAR entry in fan_out form, or None if it is not HTTP(S)"""
+    import urllib.parse
+    request = entry.get('request') or {}
+    url = request.get('url', '')
+    if not url.startswith(('http://', 'https://')):
+        return None
+    headers = {}
+    for header in request.get('headers') or []:
+        name = header.get('name', '')
+        if name and not name.startswith(':') and name.lower() not in HAR_SKIPPED_HEADERS:
+            headers[name] = header.get('value', '')
+    body = None
+    post = request.get('postData')
+    if post:
+        body = post.get('text')
+        if body is None and post.get('params'):
+            body = urllib.parse.urlencode([(p.get('name', ''), p.get('value', '')) for p in post['params']])
+    return {'method': request.get('method', 'GET').upper(), 'url': url, 'headers': headers, 'body': body,
+            'recorded_at': _har_started(entry),
+            'recorded_status': (entry.get('response') or {}).get('status')}
+
+
+def pace_requests(requests: Iterable[Dict[str, Any]], speed: float = 1.0) -> Iterator[Dict[str, Any]]:
+    """Hold each request back until its 'recorded_at' time, scaled by 1/speed.
+
+    Times are relative to the first timed request. A request recorded
+    earlier than the one before it, or without a time, goes straight out.
+    Each request gets 'due', the monotonic time it was meant to be sent.
+    """
+    start = time.monotonic()
+    first = None
+    for request in requests:
+        due = time.monotonic()
+        if request.get('recorded_at') is not None:
+            if first is None:
+                first = request['recorded_at']
+            due = start + (request['recorded_at'] - first) / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        request['due'] = due
+        yield request
+
+
+def build_request(args, env: Dict[str, str], data_text: Optional[str] = None) -> Dict[str, Any]:
+    """Resolve URL, headers, auth and body from request arguments.
+
+    Names that could not be resolved are returned under 'unresolved'.
+    `data_text` is the contents of --data-file when the caller has
+    already read it. Raises OSError if the body file cannot be read.
+    """
+    missing = set()
+
     # Replace env vars in URL
-    url = replace_env_vars(args.url, env)
+    url = replace_env_vars(args.url, env, missing)
     
     # Parse headers
     headers = parse_headers(args.header) if args.header else {}
     
     # Replace env vars in headers
     for key in headers:
-        headers[key] = replace_env_vars(headers[key], env)
+        headers[key] = replace_env_vars(headers[key], env, missing)
     
     # Handle authentication
     if args.bearer:
-        token = replace_env_vars(args.bearer, env)
+        token = replace_env_vars(args.bearer, env, missing)
         headers['Authorization'] = f'Bearer {token}'
     elif args.basic:
         import base64
-        credentials = replace_env_vars(args.basic, env)
+        credentials = replace_env_vars(args.basic, env, missing)
         encoded = base64.b64encode(credentials.encode()).decode()
         headers['Authorization'] = f'Basic {encoded}'
     elif args.api_key:
-        key = replace_env_vars(args.api_key, env)
+        key = replace_env_vars(args.api_key, env, missing)
         headers[args.api_key_header] = key
     
     # Read body from file or argument
     body = None
     if args.data:
-        body = replace_env_vars(args.data, env)
+        body = replace_env_vars(args.data, env, missing)
     elif args.data_file:
-        try:
+        if data_text is None:
             with open(args.data_file, 'r', encoding='utf-8') as f:
-                body = f.read()
-            body = replace_env_vars(body, env)
-        except Exception as e:
+                data_text = f.read()
+        body = replace_env_vars(data_text, env, missing)
+    
+    return {'method': args.method, 'url': url, 'headers': headers, 'body': body,
+            'unresolved': sorted(missing)}
+
+
+def open_upload(path: str) -> BinaryIO:
+    """Open a file (or '-' for stdin) for streaming as a request body"""
+    if path == '-':
+        return sys.stdin.buffer
+    return open(path, 'rb', buffering=STREAM_CHUNK_SIZE)
+
+
+def info_stream(args):
+    """Return where status messages go: stderr when the body is streamed to stdout"""
+    return sys.stderr if getattr(args, 'output', None) == '-' else sys.stdout
+
+
+class ProgressMeter:
+    """Throttled single-line download progress on stderr"""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.start = time.time()
+        self.last = 0.0
+        self.enabled = sys.stderr.isatty()
+
+    def __call__(self, done: int, total: Optional[int]):
+        now = time.time()
+        if not self.enabled or now - self.last < self.interval:
+            return
+        self.last = now
+        rate = done / (now - self.start) if now > self.start else 0
+        percent = f"{done * 100 / total:5.1f}% " if total else ""
+        sys.stderr.write(f"\r{Colors.GRAY}{percent}{format_size(done)} "
+                         f"({format_size(rate)}/s){Colors.RESET}\033[K")
+        sys.stderr.flush()
+
+    def finish(self):
+        if self.enabled and self.last:
+            sys.stderr.write("\r\033[K")
+            sys.stderr.flush()
+
+
+def download_response(args, url: str, headers: Dict[str, str],
+                      body: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Stream the response body to args.output ('-' for stdout), resuming if asked"""
+    out = info_stream(args)
+    resume_from = 0
+    try:
+        if args.output == '-':
+            sink = sys.stdout.buffer
+        else:
+            path = Path(args.output)
+            if args.resume and path.exists():
+                resume_from = path.stat().st_size
+            sink = open(path, 'r+b' if resume_from else 'wb')
+    except OSError as e:
+        print(f"{Colors.RED}[X] Cannot open output: {e}{Colors.RESET}", file=out)
+        return None
+    
+    if resume_from:
+        print(f"\n{Colors.GRAY}Resuming from {format_size(resume_from)}...{Colors.RESET}", file=out)
+    else:
+        print(f"\n{Colors.GRAY}Sending request...{Colors.RESET}", file=out)
+    
+    meter = ProgressMeter()
+    try:
+        return make_request(args.method, url, headers, body, args.timeout,
+                            output=sink, resume_from=resume_from, progress=meter,
+                            retry=retry_policy_from_args(args))
+    finally:
+        meter.finish()
+        if sink is not sys.stdout.buffer:
+            sink.close()
+
+
+def print_attempts(response: Dict[str, Any], out=None):
+    """List the attempts of a retried request"""
+    if not response.get('attempts'):
+        return
+    steps = []
+    for attempt in response['attempts']:
+        step = str(attempt.get('status') or 'ERR')
+        if 'backoff' in attempt:
+            step += f" (waited {format_duration(attempt['backoff'])})"
+        steps.append(step)
+    print(f"{Colors.GRAY}Attempts: {' -> '.join(steps)}{Colors.RESET}", file=out or sys.stdout)
+
+
+def print_download_summary(args, response: Dict[str, Any]):
+    """Print status, size, hash and throughput of a streamed download"""
+    out = info_stream(args)
+    status_color = Colors.GREEN if response['status'] < 300 else Colors.YELLOW
+    target = 'stdout' if args.output == '-' else args.output
+    action = 'Appended' if response.get('resumed') else 'Saved'
+    print(f"\n{status_color}{Colors.BOLD}{response['status']} {response['reason']}{Colors.RESET}", file=out)
+    print(f"{Colors.GRAY}Time: {format_duration(response['duration'])} | "
+          f"Speed: {format_size(response['throughput'])}/s{Colors.RESET}", file=out)
+    print(f"{Colors.GREEN}[OK] {action} {format_size(response['size'])} to {target}{Colors.RESET}", file=out)
+    print(f"{Colors.GRAY}sha256: {response['sha256']}{Colors.RESET}", file=out)
+    if args.verbose:
+        print(f"{Colors.GRAY}{format_timings(response['timings'])}{Colors.RESET}", file=out)
+        print(f"\n{Colors.GRAY}Headers:{Colors.RESET}", file=out)
+        for key, value in response['headers'].items():
+            print(f"  {Colors.CYAN}{key}:{Colors.RESET} {value}", file=out)
+
+
+def cmd_request(args):
+    """Execute HTTP request"""
+    if args.data_source:
+        return cmd_request_rows(args)
+    ensure_data_dirs()
+    
+    # Load environment variables
+    env = load_json(ENV_FILE)
+    
+    try:
+        request = build_request(args, env)
+    except OSError as e:
+        print(f"{Colors.RED}[X] Error reading file: {e}{Colors.RESET}")
+        return
+    
+    url, headers, body = request['url'], request['headers'], request['body']
+    print_unresolved(request['unresolved'], sys.stderr if args.format != 'text' else None)
+    
+    # Stream the upload file as-is, without templating
+    upload = None
+    if args.upload_file:
+        if body is not None:
+            print(f"{Colors.RED}[X] Use only one of -d, -f and --upload-file{Colors.RESET}")
+            return
+        try:
+            upload = open_upload(args.upload_file)
+        except OSError as e:
             print(f"{Colors.RED}[X] Error reading file: {e}{Colors.RESET}")
             return
     
+    if args.format != 'text':
+        if args.output:
+            print(f"{Colors.RED}[X] --format cannot be combined with -o{Colors.RESET}", file=sys.stderr)
+            return
+        try:
+            response = make_request(args.method, url, headers, upload or body, args.timeout,
+                                    retry=retry_policy_from_args(args))
+        finally:
+            if upload is not None and upload is not sys.stdin.buffer:
+                upload.close()
+        RecordWriter(args.format, sys.stdout).write(
+            response_record(args.method, url, response, args.body or args.format == 'raw'))
+        save_to_history(args.method, url, headers, body, response,
+                        os.path.abspath(args.upload_file) if args.upload_file and args.upload_file != '-' else None)
+        return
+    
     # Print request info if verbose
     if args.verbose:
-        print_request_info(args.method, url, headers, body)
+        shown_body = f"<streamed from {args.upload_file}>" if upload else body
+        print_request_info(args.method, url, headers, shown_body)
+    
+    stream = ResponseStream(info_stream(args), args.max_items, args.max_depth)
     
-    # Make request
-    print(f"\n{Colors.GRAY}Sending request...{Colors.RESET}")
-    response = make_request(args.method, url, headers, body, args.timeout)
+    try:
+        if args.output:
+            response = download_response(args, url, headers, upload or body)
+            if response is None:
+                return
+        else:
+            # Make request, pretty-printing JSON bodies as they arrive
+            print(f"\n{Colors.GRAY}Sending request...{Colors.RESET}")
+            response = make_request(args.method, url, headers, upload or body, args.timeout,
+                                    on_response=None if args.verbose else stream.start,
+                                    retry=retry_policy_from_args(args))
+    finally:
+        if upload is not None and upload is not sys.stdin.buffer:
+            upload.close()
+        stream.close()
+    print_attempts(response, info_stream(args))
     
     # Handle errors
     if not response.get('success') and 'error' in response:
-        print(f"\n{Colors.RED}[X] Error: {response['error']}{Colors.RESET}")
-        print(f"{Colors.GRAY}Duration: {format_duration(response['duration'])}{Colors.RESET}")
+        print(f"\n{Colors.RED}[X] Error: {response['error']}{Colors.RESET}", file=info_stream(args))
+        print(f"{Colors.GRAY}Duration: {format_duration(response['duration'])}{Colors.RESET}", file=info_stream(args))
         return
     
     # Print response
-    if args.verbose:
+    if args.output and 'sha256' in response:
+        print_download_summary(args, response)
+    elif args.verbose:
         # Create a mock response object
         class MockResponse:
             def __init__(self, status, reason, headers):
@@ -351,104 +3792,514 @@ def cmd_request(args):
             response['reason'],
             response['headers']
         )
-        print_response_info(mock_resp, response['body'], response['duration'])
+        print_response_info(mock_resp, response['body'], response['duration'], response['size'],
+                            response.get('timings'), response.get('cache'), response.get('wire_size'),
+                            args.max_items, args.max_depth)
     else:
-        # Simple output
-        status_color = Colors.GREEN if response['status'] < 300 else Colors.YELLOW if response['status'] < 400 else Colors.RED
-        print(f"\n{status_color}{Colors.BOLD}{response['status']} {response['reason']}{Colors.RESET}")
-        print(f"{Colors.GRAY}Time: {format_duration(response['duration'])} | Size: {format_size(response['size'])}{Colors.RESET}")
-        
-        # Pretty print JSON body
-        if response['body']:
+        # Simple output; a streamed body has already been printed under its status line
+        out = info_stream(args)
+        if not stream.started:
+            print_status_line(response, out)
+        cache_note = f" | Cache: {response['cache']}" if response.get('cache') else ''
+        footer = f"{Colors.GRAY}Time: {format_duration(response['duration'])} | Size: {format_sizes(response['size'], response.get('wire_size'))}{cache_note}{Colors.RESET}"
+        if stream.started:
+            print(f"\n{footer}", file=out)
+        else:
+            print(footer, file=out)
+            if response['body']:
+                print(file=out)
+                print_json(response['body'], out, args.max_items, args.max_depth)
+    
+    # Save to history
+    upload_file = None
+    if args.upload_file and args.upload_file != '-':
+        upload_file = os.path.abspath(args.upload_file)
+    save_to_history(args.method, url, headers, body, response, upload_file)
+    
+    print(f"\n{Colors.GREEN}[OK] Request saved to history{Colors.RESET}", file=info_stream(args))
+
+
+def cmd_request_rows(args):
+    """Send the request once per --data-source row, streaming results to a JSONL (or --format) file"""
+    import collections
+    if args.upload_file or args.output:
+        print(f"{Colors.RED}[X] --data-source cannot be combined with -T or -o{Colors.RESET}")
+        return
+    env = load_json(ENV_FILE)
+    source = args.data_source
+    fmt = 'jsonl' if args.format == 'text' else args.format
+    results_path = args.results or ('-' if source == '-' else
+                                    str(Path(source).with_suffix('')) + f'.results.{fmt}')
+    try:
+        data_text = None
+        if args.data_file:
+            with open(args.data_file, 'r', encoding='utf-8') as f:
+                data_text = f.read()
+        lines = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8', newline='')
+    except OSError as e:
+        print(f"{Colors.RED}[X] Error reading file: {e}{Colors.RESET}")
+        return
+    out = sys.stderr if results_path == '-' else sys.stdout
+    
+    def requests():
+        for number, row in data_rows(lines, source.lower().endswith('.csv')):
+            if isinstance(row, ValueError):
+                yield {'row': number, 'error': str(row)}
+                continue
+            request = build_request(args, collections.ChainMap(row_variables(row), env), data_text)
+            request['row'] = number
+            yield request
+    
+    print(f"{Colors.CYAN}Sending {args.method.upper()} for each row of {source} "
+          f"({args.concurrency} workers){Colors.RESET}", file=out)
+    limiter = rate_limiter_from_args(args, args.concurrency)
+    retry = retry_policy_from_args(args)
+    statuses: Dict[Any, int] = {}
+    count = 0
+    meter_enabled = sys.stderr.isatty()
+    last = 0.0
+    start = time.perf_counter()
+    results = sys.stdout if results_path == '-' else open(results_path, 'w', encoding='utf-8', newline='')
+    writer = RecordWriter(fmt, results, ('row',) + RECORD_FIELDS)
+    try:
+        for result in fan_out(requests(), args.concurrency, args.timeout, limiter, retry):
+            record = fan_out_record(result, args.body or fmt == 'raw')
+            writer.write(record)
+            count += 1
+            key = record.get('status') or 'ERR'
+            statuses[key] = statuses.get(key, 0) + 1
+            now = time.perf_counter()
+            if meter_enabled and now - last >= 0.1:
+                last = now
+                sys.stderr.write(f"\r{Colors.GRAY}{count} rows ({count / (now - start):.0f}/s){Colors.RESET}\033[K")
+                sys.stderr.flush()
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+        if results is not sys.stdout:
+            results.close()
+        if meter_enabled and last:
+            sys.stderr.write("\r\033[K")
+    elapsed = time.perf_counter() - start
+    
+    counts = ', '.join(f"{status}: {n}" for status, n in sorted(statuses.items(), key=lambda item: str(item[0])))
+    print(f"{Colors.GREEN}[OK] {count} rows in {format_duration(elapsed)}{Colors.RESET} "
+          f"{Colors.GRAY}({counts or 'no rows'}){Colors.RESET}", file=out)
+    if results_path != '-':
+        print(f"{Colors.GRAY}Results: {results_path}{Colors.RESET}", file=out)
+    if retry is not None:
+        print(f"{Colors.GRAY}{retry.summary()}{Colors.RESET}", file=out)
+    print_rate_limit_summary(limiter, out)
+
+
+def parse_age(text: str) -> float:
+    """Parse an age like '90s', '15m', '1h' or '7d' into seconds"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def print_history_entry(number: int, entry: Dict[str, Any]):
+    """Print one history entry as a single line"""
+    from datetime import datetime
+    timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+    method = entry['method']
+    url = entry['url']
+    status = entry['response'].get('status') or 'ERR'
+    duration = entry['response'].get('duration') or 0
+    
+    if not isinstance(status, int):
+        status_color = Colors.GRAY
+    else:
+        status_color = Colors.GREEN if status < 300 else Colors.YELLOW if status < 400 else Colors.RED
+    
+    print(f"{Colors.GRAY}{number:3d}.{Colors.RESET} {Colors.CYAN}{timestamp}{Colors.RESET} | "
+          f"{Colors.BOLD}{method:6s}{Colors.RESET} | "
+          f"{status_color}{status}{Colors.RESET} | "
+          f"{Colors.GRAY}{format_duration(duration)}{Colors.RESET} | "
+          f"{url[:60]}")
+
+
+def cmd_history(args):
+    """Show or query request history"""
+    ensure_data_dirs()
+    
+    if args.action == 'query':
+        cmd_history_query(args)
+        return
+    
+    # Show last N entries (seeks straight to them via the offset index)
+    entries = get_history_store().tail(args.limit)
+    
+    if args.format != 'text':
+        write_history_records(args.format, reversed(entries))
+        return
+    
+    if not entries:
+        print(f"{Colors.YELLOW}No requests in history{Colors.RESET}")
+        return
+    
+    print(f"\n{Colors.BOLD}Request History ({len(entries)} entries){Colors.RESET}\n")
+    
+    for i, entry in enumerate(reversed(entries), 1):
+        print_history_entry(i, entry)
+    
+    print(f"\n{Colors.GRAY}Use 'restcli replay <number>' to replay a request{Colors.RESET}")
+
+
+def write_history_records(fmt: str, entries: Iterable[Dict[str, Any]]):
+    """Write history entries, numbered from 1, as --format records"""
+    writer = RecordWriter(fmt, sys.stdout, ('number', 'timestamp') + RECORD_FIELDS[:-1])
+    for number, entry in enumerate(entries, 1):
+        record = {'number': number, 'timestamp': entry['timestamp']}
+        record.update(response_record(entry['method'], entry['url'], entry.get('response') or {}))
+        writer.write(record)
+
+
+def cmd_history_query(args):
+    """Filter and aggregate history in SQLite"""
+    store = get_history_store()
+    if not isinstance(store, SqliteHistoryStore):
+        print(f"{Colors.YELLOW}History queries need the SQLite backend: "
+              f"export RESTCLI_HISTORY_BACKEND=sqlite{Colors.RESET}")
+        return
+    
+    try:
+        since = parse_age(args.since) if args.since else None
+        results = store.query(args.method, args.host, args.path, args.min_status,
+                              args.max_status, since, args.group_by, args.percentile,
+                              args.limit)
+    except ValueError as e:
+        print(f"{Colors.RED}[X] Invalid query: {e}{Colors.RESET}")
+        return
+    
+    if args.format != 'text':
+        if args.group_by is None:
+            write_history_records(args.format, results)
+        else:
+            writer = RecordWriter(args.format, sys.stdout, ('group', 'count', 'errors', 'avg', 'p', 'max'))
+            for row in results:
+                writer.write(dict(row))
+        return
+    
+    if not results:
+        print(f"{Colors.YELLOW}No matching requests{Colors.RESET}")
+        return
+    
+    if args.group_by is None:
+        print(f"\n{Colors.BOLD}Matching Requests ({len(results)} entries){Colors.RESET}\n")
+        for i, entry in enumerate(results, 1):
+            print_history_entry(i, entry)
+        return
+    
+    pct_label = f"p{args.percentile:g}"
+    print(f"\n{Colors.BOLD}Requests by {args.group_by}{Colors.RESET}\n")
+    print(f"{Colors.GRAY}{'count':>7s} | {'errors':>6s} | {'avg':>8s} | {pct_label:>8s} | {'max':>8s} | {args.group_by}{Colors.RESET}")
+    for row in results:
+        error_color = Colors.RED if row['errors'] else Colors.GREEN
+        print(f"{row['count']:7d} | {error_color}{row['errors']:6d}{Colors.RESET} | "
+              f"{format_duration(row['avg'] or 0):>8s} | {format_duration(row['p'] or 0):>8s} | "
+              f"{format_duration(row['max'] or 0):>8s} | {Colors.CYAN}{row['group']}{Colors.RESET}")
+
+
+def parse_history_selection(spec: str) -> List[int]:
+    """Parse '3', '1-500' or '1-10,15' into history numbers (1 = most recent)"""
+    numbers = []
+    for part in spec.split(','):
+        first, sep, last = part.strip().partition('-')
+        try:
+            start = int(first)
+            stop = int(last) if sep else start
+        except ValueError:
+            raise ValueError(f"Invalid history selection: {spec!r}")
+        start, stop = min(start, stop), max(start, stop)
+        if start < 1:
+            raise ValueError(f"History numbers start at 1: {spec!r}")
+        numbers.extend(range(start, stop + 1))
+    return list(dict.fromkeys(numbers))
+
+
+HISTORY_FILTER_TERM = re.compile(r'^\s*(method|host|path|status)\s*(!=|>=|<=|=|>|<)\s*(.*?)\s*$')
+
+
+def parse_history_filter(expression: str) -> Callable[[Dict[str, Any]], bool]:
+    """Compile 'method=GET,host=*.example.com,status>=500' into an entry predicate.
+
+    Terms are ANDed. = and != take shell wildcards (status=5*); the
+    ordering operators compare the recorded status numerically.
+    """
+    import fnmatch
+    import urllib.parse
+    terms = []
+    for text in expression.split(','):
+        if not text.strip():
+            continue
+        match = HISTORY_FILTER_TERM.match(text)
+        if not match:
+            raise ValueError(f"Invalid filter term {text.strip()!r} (expected e.g. method=GET, status>=500)")
+        field, op, value = match.groups()
+        if op not in ('=', '!=') and field != 'status':
+            raise ValueError(f"Only status supports {op}")
+        if op not in ('=', '!='):
             try:
-                formatted = json.dumps(json.loads(response['body']), indent=2)
-                print(f"\n{formatted}")
-            except json.JSONDecodeError:
-                print(f"\n{response['body']}")
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"Status must be a number in {text.strip()!r}")
+        terms.append((field, op, value))
+    
+    def field_value(entry: Dict[str, Any], field: str):
+        if field == 'method':
+            return entry.get('method', '').upper()
+        if field == 'status':
+            return (entry.get('response') or {}).get('status')
+        parts = urllib.parse.urlsplit(entry.get('url', ''))
+        return parts.hostname or '' if field == 'host' else parts.path or '/'
+    
+    def matches(entry: Dict[str, Any]) -> bool:
+        for field, op, value in terms:
+            actual = field_value(entry, field)
+            if op in ('=', '!='):
+                pattern = value.upper() if field == 'method' else value
+                if fnmatch.fnmatchcase(str(actual), pattern) != (op == '='):
+                    return False
+            elif actual is None or not {'>': actual > value, '<': actual < value,
+                                        '>=': actual >= value, '<=': actual <= value}[op]:
+                return False
+        return True
+    
+    return matches
+
+
+def replay_entry(entry: Dict[str, Any], timeout: float = 30,
+                 pool: Optional[ConnectionPool] = None,
+                 limiter: Optional[RateLimiter] = None,
+                 retry: Optional[RetryPolicy] = None) -> Dict[str, Any]:
+    """Re-send a history entry, re-streaming its upload file if it had one"""
+    try:
+        upload = open_upload(entry['upload_file']) if entry.get('upload_file') else None
+    except OSError as e:
+        return {'success': False, 'error': f"Cannot reopen upload file: {e}", 'duration': 0}
+    send = limiter.request if limiter is not None else make_request
+    try:
+        return send(entry['method'], entry['url'], entry.get('headers', {}),
+                    upload or entry.get('body'), timeout, pool=pool, retry=retry)
+    finally:
+        if upload is not None:
+            upload.close()
+
+
+def replay_entries(entries: List[tuple], concurrency: int = 8, timeout: float = 30,
+                   on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   diff: bool = False, ignore: Optional['re.Pattern'] = None,
+                   limiter: Optional[RateLimiter] = None,
+                   retry: Optional[RetryPolicy] = None) -> List[Dict[str, Any]]:
+    """Replay (number, entry) pairs on a worker pool sharing one connection pool.
+
+    Returns {'number', 'entry', 'response'} per pair in the given order,
+    plus 'diff' against the recorded body (see diff_recorded) if asked;
+    on_result is called as each one completes. Requests go through
+    `limiter` and are re-sent per `retry` if given.
+    """
+    import concurrent.futures
+    pool = ConnectionPool(max_per_host=concurrency)
+    get_dns_cache().prefetch([entry['url'] for _, entry in entries], concurrency)
     
-    # Save to history
-    save_to_history(args.method, url, headers, body, response)
+    def execute(number: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+        response = replay_entry(entry, timeout, pool, limiter, retry)
+        result = {'number': number, 'entry': entry, 'response': response}
+        if diff:
+            result['diff'] = diff_recorded((entry.get('response') or {}).get('body_sha256'),
+                                           response.get('body'), ignore, response.get('body_sha256'))
+        return result
     
-    print(f"\n{Colors.GREEN}[OK] Request saved to history{Colors.RESET}")
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(execute, number, entry) for number, entry in entries]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            results[result['number']] = result
+            if on_result:
+                on_result(result)
+    pool.close()
+    return [results[number] for number, _ in entries]
 
 
-def cmd_history(args):
-    """Show request history"""
-    ensure_data_dirs()
-    history = load_json(HISTORY_FILE)
-    
-    if not history:
-        print(f"{Colors.YELLOW}No requests in history{Colors.RESET}")
+# Replays this much slower (or faster) than recorded, by at least
+# REPLAY_MIN_DELTA seconds, are flagged
+REPLAY_SLOWDOWN = 1.5
+REPLAY_MIN_DELTA = 0.05
+
+
+def replay_change(result: Dict[str, Any]) -> str:
+    """Classify a replay against its recording: same, status, slower, faster or error"""
+    response = result['response']
+    recorded = result['entry'].get('response') or {}
+    if 'error' in response:
+        return 'error'
+    if response.get('status') != recorded.get('status'):
+        return 'status'
+    before, after = recorded.get('duration') or 0, response['duration']
+    if not before or abs(after - before) < REPLAY_MIN_DELTA:
+        return 'same'
+    if after >= before * REPLAY_SLOWDOWN:
+        return 'slower'
+    if after * REPLAY_SLOWDOWN <= before:
+        return 'faster'
+    return 'same'
+
+
+def cmd_replay_batch(args, store, numbers: Optional[List[int]]):
+    """Replay many history entries in parallel and report what changed"""
+    count = len(store)
+    entries = store.tail(count)
+    if numbers is None:
+        numbers = list(range(1, count + 1))
+    selected = [(n, entries[-n]) for n in numbers if n <= count]
+    if args.filter:
+        try:
+            predicates = [parse_history_filter(expression) for expression in args.filter]
+        except ValueError as e:
+            print(f"{Colors.RED}[X] {e}{Colors.RESET}")
+            return
+        selected = [(n, entry) for n, entry in selected if all(p(entry) for p in predicates)]
+    if not selected:
+        print(f"{Colors.YELLOW}No history entries match{Colors.RESET}", file=sys.stderr if args.format != 'text' else None)
         return
     
-    # Show last N entries
-    entries = history[-args.limit:] if args.limit else history
-    
-    print(f"\n{Colors.BOLD}Request History ({len(entries)} entries){Colors.RESET}\n")
-    
-    for i, entry in enumerate(reversed(entries), 1):
-        timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
-        method = entry['method']
-        url = entry['url']
-        status = entry['response'].get('status', 'ERR')
-        duration = entry['response'].get('duration', 0)
+    if args.format != 'text':
+        writer = RecordWriter(args.format, sys.stdout, ('number', 'change') + RECORD_FIELDS)
         
-        status_color = Colors.GREEN if status < 300 else Colors.YELLOW if status < 400 else Colors.RED if status else Colors.GRAY
+        def on_result(result: Dict[str, Any]):
+            record = {'number': result['number'], 'change': replay_change(result)}
+            record.update(response_record(result['entry']['method'], result['entry']['url'],
+                                          result['response'], args.body or args.format == 'raw'))
+            writer.write(record)
         
-        print(f"{Colors.GRAY}{i:3d}.{Colors.RESET} {Colors.CYAN}{timestamp}{Colors.RESET} | "
-              f"{Colors.BOLD}{method:6s}{Colors.RESET} | "
-              f"{status_color}{status}{Colors.RESET} | "
-              f"{Colors.GRAY}{format_duration(duration)}{Colors.RESET} | "
-              f"{url[:60]}")
+        replay_entries(selected, args.concurrency, args.timeout, on_result,
+                       limiter=rate_limiter_from_args(args, args.concurrency),
+                       retry=retry_policy_from_args(args))
+        return
     
-    print(f"\n{Colors.GRAY}Use 'restcli replay <number>' to replay a request{Colors.RESET}")
+    print(f"{Colors.CYAN}Replaying {len(selected)} requests "
+          f"(concurrency {args.concurrency}){Colors.RESET}\n")
+    limiter = rate_limiter_from_args(args, args.concurrency)
+    retry = retry_policy_from_args(args)
+    dns_before = get_dns_cache().counters()
+    start = time.perf_counter()
+    results = replay_entries(selected, args.concurrency, args.timeout, diff=args.diff,
+                             ignore=compile_ignore(args.ignore), limiter=limiter, retry=retry)
+    elapsed = time.perf_counter() - start
+    
+    colors = {'same': Colors.GRAY, 'faster': Colors.GREEN, 'slower': Colors.YELLOW,
+              'status': Colors.RED, 'error': Colors.RED}
+    print(f"{Colors.GRAY}{'#':>4s} | {'method':6s} | {'status':11s} | {'time':19s} | url{Colors.RESET}")
+    changes: Dict[str, int] = {}
+    for result in results:
+        response = result['response']
+        recorded = result['entry'].get('response') or {}
+        change = replay_change(result)
+        changes[change] = changes.get(change, 0) + 1
+        before = recorded.get('status') or 'ERR'
+        after = 'ERR' if 'error' in response else response.get('status')
+        status = f"{before}" if change != 'status' and change != 'error' else f"{before} -> {after}"
+        recorded_time = format_duration(recorded['duration']) if recorded.get('duration') else '-'
+        times = f"{recorded_time} -> {format_duration(response['duration'])}"
+        print(f"{result['number']:>4d} | {result['entry']['method']:6s} | "
+              f"{colors[change]}{status:11s}{Colors.RESET} | {times:19s} | {result['entry']['url'][:50]}")
+        if 'error' in response:
+            print(f"       {Colors.RED}{response['error']}{Colors.RESET}")
+        if result.get('diff'):
+            changes['body'] = changes.get('body', 0) + 1
+            for line in format_diff(result['diff']):
+                print(f"       {line}")
+        elif args.diff and result.get('diff') is None and 'error' not in response:
+            changes['unrecorded'] = changes.get('unrecorded', 0) + 1
+    
+    changed = changes.get('status', 0) + changes.get('error', 0) + changes.get('body', 0)
+    result_color = Colors.GREEN if not changed else Colors.RED
+    print(f"\n{result_color}{len(results)} replayed: {changes.get('same', 0)} unchanged, "
+          f"{changes.get('status', 0)} status changed, {changes.get('error', 0)} errors{Colors.RESET} "
+          f"{Colors.GRAY}({changes.get('slower', 0)} slower, {changes.get('faster', 0)} faster "
+          f"than {REPLAY_SLOWDOWN}x; {format_duration(elapsed)}){Colors.RESET}")
+    print(f"{Colors.GRAY}{format_dns_stats(dns_before)}{Colors.RESET}")
+    print_rate_limit_summary(limiter)
+    if retry is not None:
+        print(f"{Colors.GRAY}{retry.summary()}{Colors.RESET}")
+    if args.diff:
+        print(f"{result_color}{changes.get('body', 0)} bodies changed{Colors.RESET}"
+              f"{Colors.GRAY}, {changes.get('unrecorded', 0)} with no recorded body hash{Colors.RESET}")
 
 
 def cmd_replay(args):
     """Replay a request from history"""
     ensure_data_dirs()
-    history = load_json(HISTORY_FILE)
+    store = get_history_store()
     
-    if not history:
+    if not len(store):
         print(f"{Colors.YELLOW}No requests in history{Colors.RESET}")
         return
     
-    # Get entry by index (counting from end)
     try:
-        index = -args.number
-        entry = history[index]
-    except IndexError:
-        print(f"{Colors.RED}[X] Invalid history index: {args.number}{Colors.RESET}")
+        numbers = parse_history_selection(args.selection or '1') if args.selection or not args.filter else None
+    except ValueError as e:
+        print(f"{Colors.RED}[X] {e}{Colors.RESET}")
+        return
+    if numbers is None or len(numbers) > 1 or args.filter:
+        if args.concurrency < 1:
+            print(f"{Colors.RED}[X] Concurrency must be at least 1{Colors.RESET}")
+            return
+        cmd_replay_batch(args, store, numbers)
+        return
+    
+    # Get entry by index (counting from end)
+    entry = store.get(numbers[0])
+    if entry is None:
+        print(f"{Colors.RED}[X] Invalid history index: {numbers[0]}{Colors.RESET}")
+        return
+    
+    if args.format != 'text':
+        response = replay_entry(entry, args.timeout, retry=retry_policy_from_args(args))
+        RecordWriter(args.format, sys.stdout).write(
+            response_record(entry['method'], entry['url'], response, args.body or args.format == 'raw'))
         return
     
     # Recreate request
     print(f"{Colors.CYAN}Replaying request from {entry['timestamp']}{Colors.RESET}")
     
-    # Make request
-    response = make_request(
-        entry['method'],
-        entry['url'],
-        entry.get('headers', {}),
-        entry.get('body'),
-        30
-    )
+    # Make request, re-streaming the original upload file if there was one
+    response = replay_entry(entry, args.timeout, retry=retry_policy_from_args(args))
     
     # Print response
     status_color = Colors.GREEN if response.get('status', 0) < 300 else Colors.RED
     print(f"\n{status_color}{Colors.BOLD}{response.get('status', 'ERR')} {response.get('reason', 'Error')}{Colors.RESET}")
     print(f"{Colors.GRAY}Time: {format_duration(response['duration'])}{Colors.RESET}")
+    print_attempts(response)
+    if 'error' in response:
+        print(f"{Colors.RED}[X] {response['error']}{Colors.RESET}")
     
-    if response.get('body'):
-        try:
-            formatted = json.dumps(json.loads(response['body']), indent=2)
-            print(f"\n{formatted}")
-        except json.JSONDecodeError:
-            print(f"\n{response['body']}")
+    if args.diff and 'error' not in response:
+        changes = diff_recorded((entry.get('response') or {}).get('body_sha256'),
+                                response.get('body'), compile_ignore(args.ignore),
+                                response.get('body_sha256'))
+        if changes is None:
+            print(f"{Colors.YELLOW}[!] No body was recorded for this entry{Colors.RESET}")
+        elif not changes:
+            print(f"{Colors.GREEN}[OK] Body matches the recorded response{Colors.RESET}")
+        else:
+            print(f"\n{Colors.BOLD}Body changes{Colors.RESET}")
+            for line in format_diff(changes, limit=50):
+                print(f"  {line}")
+    elif response.get('body'):
+        print()
+        print_json(response['body'], max_items=args.max_items, max_depth=args.max_depth)
 
 
 def cmd_env(args):
     """Manage environment variables"""
-    ensure_data_dirs()
+    if args.action in ('set', 'delete'):
+        ensure_data_dirs()
     env = load_json(ENV_FILE)
     
     if args.action == 'set':
@@ -492,6 +4343,198 @@ def cmd_env(args):
             print(f"{Colors.YELLOW}Variable '{args.key}' not found{Colors.RESET}")
 
 
+def cmd_cache(args):
+    """Show or clear the response cache"""
+    cache = get_response_cache() or ResponseCache(CACHE_DIR)
+    
+    if args.action == 'stats':
+        stats = cache.stats()
+        enabled = get_response_cache() is not None
+        state = f"{Colors.GREEN}enabled" if enabled else f"{Colors.YELLOW}disabled (export RESTCLI_CACHE=1)"
+        print(f"\n{Colors.BOLD}Response Cache{Colors.RESET} {state}{Colors.RESET}\n")
+        print(f"  {Colors.CYAN}Entries:{Colors.RESET} {stats['entries']}")
+        print(f"  {Colors.CYAN}Size:{Colors.RESET}    {format_size(stats['bytes'])} of {format_size(cache.max_bytes)}")
+        print(f"  {Colors.CYAN}Path:{Colors.RESET}    {cache.directory}")
+    
+    elif args.action == 'clear':
+        removed = cache.clear()
+        print(f"{Colors.GREEN}[OK] Removed {removed} cache files{Colors.RESET}")
+
+
+def cmd_dns(args):
+    """Show or clear the DNS cache"""
+    cache = get_dns_cache()
+    
+    if args.action == 'stats':
+        mode = os.environ.get('RESTCLI_DNS_CACHE', 'memory').lower()
+        print(f"\n{Colors.BOLD}DNS Cache{Colors.RESET} {Colors.GRAY}({mode}, ttl {cache.ttl:g}s){Colors.RESET}\n")
+        print(f"  {Colors.CYAN}Hits:{Colors.RESET}    {cache.hits}")
+        print(f"  {Colors.CYAN}Misses:{Colors.RESET}  {cache.misses}")
+        entries = cache.entries()
+        print(f"  {Colors.CYAN}Entries:{Colors.RESET} {len(entries)}")
+        for host, port, remaining, addresses in entries:
+            print(f"    {host}:{port} -> {', '.join(addresses)} {Colors.GRAY}({remaining:.0f}s left){Colors.RESET}")
+    
+    elif args.action == 'clear':
+        cache.clear()
+        print(f"{Colors.GREEN}[OK] DNS cache cleared{Colors.RESET}")
+
+
+def cmd_har(args):
+    """Export history as HAR, import a HAR into history, or replay a HAR"""
+    if args.action == 'export':
+        cmd_har_export(args)
+        return
+    if not args.file:
+        print(f"{Colors.RED}[X] Usage: restcli har {args.action} <file.har>{Colors.RESET}")
+        return
+    try:
+        stream = open(args.file, 'r', encoding='utf-8-sig')
+    except OSError as e:
+        print(f"{Colors.RED}[X] Error reading file: {e}{Colors.RESET}")
+        return
+    try:
+        with stream:
+            if args.action == 'import':
+                cmd_har_import(args, stream)
+            else:
+                cmd_har_replay(args, stream)
+    except ValueError as e:
+        print(f"{Colors.RED}[X] Invalid HAR file: {e}{Colors.RESET}", file=sys.stderr)
+
+
+def cmd_har_export(args):
+    """Write the most recent history entries as a HAR 1.2 log"""
+    ensure_data_dirs()
+    store = get_history_store()
+    entries = store.tail(args.limit or len(store))
+    blobs = BlobStore(BLOB_DIR) if BLOB_DIR.exists() else None
+    har = {'log': {
+        'version': '1.2',
+        'creator': {'name': 'restcli', 'version': __version__},
+        'pages': [],
+        'entries': [history_to_har(entry, blobs) for entry in entries],
+    }}
+    if args.file in (None, '-'):
+        json.dump(har, sys.stdout, indent=2)
+        print()
+        return
+    try:
+        with open(args.file, 'w', encoding='utf-8') as f:
+            json.dump(har, f, indent=2)
+    except OSError as e:
+        print(f"{Colors.RED}[X] Error writing file: {e}{Colors.RESET}")
+        return
+    print(f"{Colors.GREEN}[OK] Exported {len(entries)} requests to {args.file}{Colors.RESET}")
+
+
+def cmd_har_import(args, stream):
+    """Append the HTTP(S) entries of a HAR file to history"""
+    from datetime import datetime
+    ensure_data_dirs()
+    store = get_history_store()
+    count = 0
+    for entry in iter_har_entries(stream):
+        request = har_request(entry)
+        if request is None or not har_host_matches(request['url'], args.host):
+            continue
+        response = entry.get('response') or {}
+        timings = entry.get('timings') or {}
+        started = request['recorded_at']
+        store.append({
+            'timestamp': (datetime.fromtimestamp(started) if started is not None else datetime.now()).isoformat(),
+            'method': request['method'], 'url': request['url'],
+            'headers': request['headers'], 'body': request['body'],
+            'response': {
+                'status': response.get('status') or None,
+                'duration': entry['time'] / 1000 if isinstance(entry.get('time'), (int, float)) else None,
+                'size': (response.get('content') or {}).get('size'),
+                'wire_size': response['bodySize'] if (response.get('bodySize') or -1) >= 0 else None,
+                'timings': {'dns': max(timings.get('dns', 0), 0),
+                            'connect': max(timings.get('connect', 0) - max(timings.get('ssl', 0), 0), 0),
+                            'tls': max(timings.get('ssl', 0), 0), 'send': max(timings.get('send', 0), 0),
+                            'ttfb': max(timings.get('wait', 0), 0), 'transfer': max(timings.get('receive', 0), 0)},
+            },
+        })
+        count += 1
+    print(f"{Colors.GREEN}[OK] Imported {count} requests into history{Colors.RESET} "
+          f"{Colors.GRAY}(keeps the last {history_limit()}){Colors.RESET}")
+
+
+def har_host_matches(url: str, patterns: Optional[List[str]]) -> bool:
+    """Whether the URL's host matches one of the --host patterns (all hosts if none)"""
+    if not patterns:
+        return True
+    import fnmatch
+    import urllib.parse
+    host = urllib.parse.urlsplit(url).hostname or ''
+    return any(fnmatch.fnmatch(host, pattern) for pattern in patterns)
+
+
+def cmd_har_replay(args, stream):
+    """Replay a HAR file concurrently or on its recorded timeline"""
+    if args.concurrency < 1 or args.speed <= 0:
+        print(f"{Colors.RED}[X] Concurrency and speed must be positive{Colors.RESET}")
+        return
+    
+    def requests():
+        for number, entry in enumerate(iter_har_entries(stream), 1):
+            request = har_request(entry)
+            if request is not None and har_host_matches(request['url'], args.host):
+                request['entry'] = number
+                yield request
+    
+    selected = requests()
+    if args.timing:
+        selected = pace_requests(selected, args.speed)
+    limiter = rate_limiter_from_args(args, args.concurrency)
+    retry = retry_policy_from_args(args)
+    writer = None
+    if args.format != 'text':
+        writer = RecordWriter(args.format, sys.stdout, ('entry', 'recorded_status') + RECORD_FIELDS)
+    else:
+        mode = f"recorded timing at {args.speed:g}x" if args.timing else f"concurrency {args.concurrency}"
+        print(f"{Colors.CYAN}Replaying {args.file} ({mode}){Colors.RESET}\n")
+    
+    statuses: Dict[Any, int] = {}
+    changed = count = 0
+    max_lag = 0.0
+    start = time.perf_counter()
+    for result in fan_out(selected, args.concurrency, args.timeout, limiter, retry):
+        response = result['response']
+        count += 1
+        status = response.get('status') or 'ERR'
+        statuses[status] = statuses.get(status, 0) + 1
+        if result['recorded_status'] and status != result['recorded_status']:
+            changed += 1
+        if 'due' in result:
+            max_lag = max(max_lag, result['started'] - result['due'])
+        if writer is not None:
+            record = {'entry': result['entry'], 'recorded_status': result['recorded_status']}
+            record.update(response_record(result['method'], result['url'], response,
+                                          args.body or args.format == 'raw'))
+            writer.write(record)
+            continue
+        color = Colors.GREEN if response.get('success') else Colors.RED
+        was = f" (was {result['recorded_status']})" if result['recorded_status'] not in (None, status) else ''
+        print(f"{result['entry']:>5d} | {result['method']:6s} | {color}{str(status):4s}{Colors.RESET}{was} | "
+              f"{Colors.GRAY}{format_duration(response['duration']):>8s}{Colors.RESET} | {result['url'][:60]}")
+        if 'error' in response:
+            print(f"        {Colors.RED}{response['error']}{Colors.RESET}")
+    if writer is not None:
+        return
+    
+    elapsed = time.perf_counter() - start
+    counts = ', '.join(f"{s}: {n}" for s, n in sorted(statuses.items(), key=lambda item: str(item[0])))
+    print(f"\n{Colors.GREEN if not changed else Colors.YELLOW}{count} replayed, {changed} with a different status"
+          f"{Colors.RESET} {Colors.GRAY}({counts or 'no HTTP entries'}; {format_duration(elapsed)}){Colors.RESET}")
+    if args.timing:
+        print(f"{Colors.GRAY}Latest send behind schedule: {format_duration(max_lag)}{Colors.RESET}")
+    print_rate_limit_summary(limiter)
+    if retry is not None:
+        print(f"{Colors.GRAY}{retry.summary()}{Colors.RESET}")
+
+
 def cmd_collection(args):
     """Manage request collections"""
     ensure_data_dirs()
@@ -502,20 +4545,49 @@ def cmd_collection(args):
             return
         
         # Get last request from history
-        history = load_json(HISTORY_FILE)
-        if not history:
+        last_request = get_history_store().get(1)
+        if last_request is None:
             print(f"{Colors.YELLOW}No requests in history to save{Colors.RESET}")
             return
         
-        last_request = history[-1]
-        
         # Save to collection file
         collection_file = COLLECTIONS_DIR / f"{args.name}.json"
         save_json(collection_file, last_request)
         
         print(f"{Colors.GREEN}[OK] Saved last request to collection '{args.name}'{Colors.RESET}")
     
-    elif args.action == 'load':
+    elif args.action == 'add':
+        if not args.name:
+            print(f"{Colors.RED}[X] Collection name required{Colors.RESET}")
+            return
+        
+        last_request = get_history_store().get(1)
+        if last_request is None:
+            print(f"{Colors.YELLOW}No requests in history to save{Colors.RESET}")
+            return
+        
+        collection_file = COLLECTIONS_DIR / f"{args.name}.json"
+        try:
+            steps = load_collection(args.name, load_json(collection_file)) if collection_file.exists() else []
+        except ValueError as e:
+            print(f"{Colors.RED}[X] {e}{Colors.RESET}")
+            return
+        
+        step = {key: last_request[key] for key in ('method', 'url', 'headers', 'body') if key in last_request}
+        step['name'] = args.step or f"step{len(steps) + 1}"
+        if any(existing['name'] == step['name'] for existing in steps):
+            print(f"{Colors.RED}[X] Step '{step['name']}' already exists in '{args.name}'{Colors.RESET}")
+            return
+        if args.depends_on:
+            step['depends_on'] = args.depends_on
+        if args.extract:
+            step['extract'] = dict(item.split('=', 1) for item in args.extract if '=' in item)
+        
+        save_json(collection_file, {'requests': steps + [step]})
+        print(f"{Colors.GREEN}[OK] Added last request to '{args.name}' as step "
+              f"'{step['name']}' ({len(steps) + 1} requests){Colors.RESET}")
+    
+    elif args.action in ('load', 'run'):
         if not args.name:
             print(f"{Colors.RED}[X] Collection name required{Colors.RESET}")
             return
@@ -525,7 +4597,12 @@ def cmd_collection(args):
             print(f"{Colors.YELLOW}Collection '{args.name}' not found{Colors.RESET}")
             return
         
-        request = load_json(collection_file)
+        data = load_json(collection_file)
+        if args.action == 'run' or 'requests' in data:
+            run_collection_command(args, data)
+            return
+        
+        request = data
         
         # Execute request
         print(f"{Colors.CYAN}Loading collection '{args.name}'{Colors.RESET}")
@@ -535,7 +4612,7 @@ def cmd_collection(args):
             request['url'],
             request.get('headers', {}),
             request.get('body'),
-            30
+            args.timeout
         )
         
         # Print response
@@ -544,11 +4621,8 @@ def cmd_collection(args):
         print(f"{Colors.GRAY}Time: {format_duration(response['duration'])}{Colors.RESET}")
         
         if response.get('body'):
-            try:
-                formatted = json.dumps(json.loads(response['body']), indent=2)
-                print(f"\n{formatted}")
-            except json.JSONDecodeError:
-                print(f"\n{response['body']}")
+            print()
+            print_json(response['body'], max_items=args.max_items, max_depth=args.max_depth)
     
     elif args.action == 'list':
         collections = list(COLLECTIONS_DIR.glob('*.json'))
@@ -561,6 +4635,9 @@ def cmd_collection(args):
         for collection in sorted(collections):
             name = collection.stem
             request = load_json(collection)
+            if isinstance(request.get('requests'), list):
+                print(f"  {Colors.CYAN}{name}{Colors.RESET} - {len(request['requests'])} requests")
+                continue
             method = request.get('method', 'GET')
             url = request.get('url', '')
             
@@ -579,8 +4656,896 @@ def cmd_collection(args):
             print(f"{Colors.YELLOW}Collection '{args.name}' not found{Colors.RESET}")
 
 
-def main():
+def run_collection_command(args, data: Any):
+    """Run every request of a collection and print a summary table"""
+    try:
+        steps = load_collection(args.name, data)
+        collection_dependencies(steps)
+    except ValueError as e:
+        print(f"{Colors.RED}[X] {e}{Colors.RESET}")
+        return
+    
+    env = load_json(ENV_FILE)
+    if args.format != 'text':
+        writer = RecordWriter(args.format, sys.stdout, ('name', 'skipped') + RECORD_FIELDS)
+        
+        def write_record(result: Dict[str, Any]):
+            record = {'name': result['name']}
+            if result.get('skipped'):
+                record.update(method=result['method'], url=result['url'], skipped=result['skipped'])
+            else:
+                record.update(response_record(result['method'], result['url'], result['response'],
+                                              args.body or args.format == 'raw'))
+            writer.write(record)
+        
+        run_collection(steps, env, args.workers, args.timeout, write_record,
+                       rate_limiter_from_args(args, args.workers), retry_policy_from_args(args))
+        return
+    
+    print(f"{Colors.CYAN}Running collection '{args.name}' "
+          f"({len(steps)} requests, {args.workers} workers){Colors.RESET}\n")
+    
+    def on_result(result: Dict[str, Any]):
+        response = result['response']
+        if result.get('skipped'):
+            print(f"  {Colors.GRAY}SKIP{Colors.RESET} {result['name']} ({result['skipped']})")
+        elif 'error' in response:
+            print(f"  {Colors.RED}ERR {Colors.RESET} {result['name']} ({response['error']})")
+        else:
+            status_color = Colors.GREEN if response['success'] else Colors.RED
+            print(f"  {status_color}{response['status']}{Colors.RESET}  {result['name']} "
+                  f"{Colors.GRAY}{format_duration(response['duration'])}{Colors.RESET}")
+    
+    limiter = rate_limiter_from_args(args, args.workers)
+    retry = retry_policy_from_args(args)
+    dns_before = get_dns_cache().counters()
+    start = time.perf_counter()
+    results = run_collection(steps, env, args.workers, args.timeout, on_result, limiter, retry)
+    elapsed = time.perf_counter() - start
+    
+    print(f"\n{Colors.BOLD}Summary{Colors.RESET}\n")
+    print(f"{Colors.GRAY}{'step':24s} | {'method':6s} | {'status':6s} | {'time':>8s} | url{Colors.RESET}")
+    passed = failed = skipped = 0
+    serial_time = 0.0
+    for result in results:
+        response = result['response']
+        if result.get('skipped'):
+            skipped += 1
+            status, status_color, duration = 'SKIP', Colors.GRAY, '-'
+        else:
+            serial_time += response['duration']
+            status = response.get('status') or 'ERR'
+            if response['success']:
+                passed += 1
+                status_color = Colors.GREEN
+            else:
+                failed += 1
+                status_color = Colors.RED
+            duration = format_duration(response['duration'])
+        print(f"{result['name'][:24]:24s} | {result['method']:6s} | "
+              f"{status_color}{str(status):6s}{Colors.RESET} | {duration:>8s} | {result['url'][:50]}")
+        if result.get('unresolved'):
+            print_unresolved(result['unresolved'])
+    
+    result_color = Colors.GREEN if not failed and not skipped else Colors.RED
+    print(f"\n{result_color}{passed} passed, {failed} failed, {skipped} skipped{Colors.RESET} "
+          f"{Colors.GRAY}in {format_duration(elapsed)} "
+          f"(sequential time {format_duration(serial_time)}){Colors.RESET}")
+    print(f"{Colors.GRAY}{format_dns_stats(dns_before)}{Colors.RESET}")
+    print_rate_limit_summary(limiter)
+    if retry is not None:
+        print(f"{Colors.GRAY}{retry.summary()}{Colors.RESET}")
+    
+    if args.diff:
+        print_collection_diff(args.name, results, compile_ignore(args.ignore))
+
+
+def print_collection_diff(name: str, results: List[Dict[str, Any]],
+                          ignore: Optional['re.Pattern'] = None):
+    """Diff each step's body against the last `--diff` run, which it then replaces"""
+    baseline_file = BASELINES_DIR / f"{name}.json"
+    baseline = load_json(baseline_file)
+    blobs = BlobStore(BLOB_DIR)
+    
+    print(f"\n{Colors.BOLD}Body changes since the last --diff run{Colors.RESET}\n")
+    changed = 0
+    for result in results:
+        response = result['response']
+        if result.get('skipped') or response.get('body') is None:
+            continue
+        changes = diff_recorded(baseline.get(result['name']), response['body'], ignore,
+                                response.get('body_sha256'))
+        baseline[result['name']] = blobs.put(response['body'], response.get('body_sha256'))
+        if changes is None:
+            print(f"  {Colors.GRAY}NEW {Colors.RESET} {result['name']} (baseline recorded)")
+        elif changes:
+            changed += 1
+            print(f"  {Colors.YELLOW}DIFF{Colors.RESET} {result['name']}")
+            for line in format_diff(changes):
+                print(f"       {line}")
+    
+    BASELINES_DIR.mkdir(exist_ok=True)
+    save_json(baseline_file, baseline)
+    result_color = Colors.GREEN if not changed else Colors.YELLOW
+    print(f"\n{result_color}{changed} bodies changed{Colors.RESET}")
+
+
+def print_bench_report(result: Dict[str, Any]):
+    """Print throughput, error rate and latency percentiles of a bench run"""
+    histogram = result['histogram']
+    count = result['requests']
+    elapsed = result['elapsed']
+    error_rate = result['errors'] / count * 100 if count else 0.0
+    error_color = Colors.GREEN if not result['errors'] else Colors.RED
+    
+    print(f"\n{Colors.BOLD}Benchmark Results{Colors.RESET}\n")
+    print(f"  {Colors.CYAN}Requests:{Colors.RESET}   {count} in {format_duration(elapsed)}")
+    print(f"  {Colors.CYAN}Throughput:{Colors.RESET} {count / elapsed if elapsed else 0:.1f} req/s")
+    print(f"  {Colors.CYAN}Errors:{Colors.RESET}     {error_color}{result['errors']} ({error_rate:.2f}%){Colors.RESET}")
+    
+    print(f"\n{Colors.GRAY}Latency:{Colors.RESET}")
+    print(f"  {Colors.CYAN}min{Colors.RESET}   {format_duration((histogram.min or 0) / 1_000_000)}")
+    print(f"  {Colors.CYAN}mean{Colors.RESET}  {format_duration(histogram.mean())}")
+    for label, pct in (('p50', 50), ('p90', 90), ('p99', 99), ('p99.9', 99.9)):
+        print(f"  {Colors.CYAN}{label:5s}{Colors.RESET} {format_duration(histogram.percentile(pct))}")
+    print(f"  {Colors.CYAN}max{Colors.RESET}   {format_duration(histogram.max / 1_000_000)}")
+    
+    print(f"\n{Colors.GRAY}Mean phase times:{Colors.RESET}")
+    print(f"  {format_timings(result['phase_means'])}")
+    print(f"  {Colors.GRAY}{result['dns']}{Colors.RESET}")
+    for line in result.get('rate_limit', []):
+        print(f"  {Colors.GRAY}Rate limit {line}{Colors.RESET}")
+    if result.get('retries'):
+        print(f"  {Colors.GRAY}{result['retries']}{Colors.RESET}")
+    
+    print(f"\n{Colors.GRAY}Status codes:{Colors.RESET}")
+    for status, n in sorted(result['statuses'].items(), key=lambda item: str(item[0])):
+        print(f"  {status}: {n}")
+
+
+def cmd_bench(args):
+    """Run a load test against a single endpoint"""
+    ensure_data_dirs()
+    env = load_json(ENV_FILE)
+    
+    try:
+        request = build_request(args, env)
+    except OSError as e:
+        print(f"{Colors.RED}[X] Error reading file: {e}{Colors.RESET}")
+        return
+    
+    print_unresolved(request['unresolved'])
+    
+    if args.concurrency < 1:
+        print(f"{Colors.RED}[X] Concurrency must be at least 1{Colors.RESET}")
+        return
+    
+    total = args.requests
+    if total is None and args.duration is None:
+        total = 100
+    
+    if args.verbose:
+        print_request_info(request['method'], request['url'], request['headers'], request['body'])
+    
+    limit = f"{total} requests" if total is not None else f"{args.duration}s"
+    pace = f" at {args.rps} req/s" if args.rps else ""
+    print(f"\n{Colors.GRAY}Benchmarking {request['method'].upper()} {request['url']} "
+          f"({limit}, concurrency {args.concurrency}{pace}, {args.engine} engine)...{Colors.RESET}")
+    
+    result = run_bench(request, args.concurrency, total, args.duration, args.rps,
+                       args.timeout, args.engine, rate_limiter_from_args(args, args.concurrency),
+                       retry_policy_from_args(args))
+    print_bench_report(result)
+
+
+# Daemon output frames: (channel, length) then `length` bytes; channel 0 ends
+# the command and carries its exit code in the length field
+DAEMON_FRAME = struct.Struct('>BI')
+DAEMON_STDOUT, DAEMON_STDERR, DAEMON_EXIT = 1, 2, 0
+
+
+class _FrameWriter(io.RawIOBase):
+    """Raw stream that sends each write to a daemon client as one frame"""
+
+    def __init__(self, sock: 'socket.socket', channel: int, tty: bool = False):
+        self.sock = sock
+        self.channel = channel
+        self.tty = tty
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self.tty
+
+    def write(self, data) -> int:
+        if data:
+            self.sock.sendall(DAEMON_FRAME.pack(self.channel, len(data)) + bytes(data))
+        return len(data)
+
+
+def _frame_stream(sock: 'socket.socket', channel: int, tty: bool) -> io.TextIOWrapper:
+    raw = _FrameWriter(sock, channel, tty)
+    return io.TextIOWrapper(io.BufferedWriter(raw, STREAM_CHUNK_SIZE), encoding='utf-8',
+                            errors='replace', line_buffering=True)
+
+
+def _client_environment() -> Dict[str, str]:
+    """The RESTCLI_* settings a forwarded command should run with"""
+    return {key: value for key, value in os.environ.items() if key.startswith('RESTCLI_')}
+
+
+class RestDaemon:
+    """Run restcli commands for thin clients from one warm process.
+
+    Listens on a Unix socket. A client sends one JSON line with its argv,
+    working directory, RESTCLI_* variables and whether its stdout/stderr
+    are terminals; the command's output comes back as DAEMON_FRAME frames.
+    Commands run one at a time because they share sys.stdout, the working
+    directory and os.environ, but the connection pool and imported modules
+    stay warm between them.
+    """
+
+    def __init__(self, path: Path = DAEMON_SOCKET):
+        self.path = path
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.started = time.time()
+        self.served = 0
+
+    def serve_forever(self, poll_interval: float = 0.2):
+        import socket
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            listener.bind(str(self.path))
+        finally:
+            os.umask(old_umask)
+        listener.listen(64)
+        listener.settimeout(poll_interval)
+        try:
+            while not self.stopping.is_set():
+                try:
+                    conn, _ = listener.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+            with contextlib.suppress(FileNotFoundError):
+                self.path.unlink()
+
+    def shutdown(self):
+        self.stopping.set()
+
+    def handle(self, conn: 'socket.socket'):
+        with conn:
+            try:
+                request = json.loads(conn.makefile('rb').readline())
+                argv = [str(arg) for arg in request['argv']]
+            except (ValueError, KeyError, TypeError):
+                return
+            
+            tty = request.get('tty') or [False, False]
+            stdout = _frame_stream(conn, DAEMON_STDOUT, bool(tty[0]))
+            stderr = _frame_stream(conn, DAEMON_STDERR, bool(tty[1]))
+            try:
+                if argv[:1] == ['daemon']:
+                    code = self.control(argv[1:], stdout)
+                else:
+                    with self.lock:
+                        code = self.run(argv, request, stdout, stderr)
+                stdout.flush()
+                stderr.flush()
+                conn.sendall(DAEMON_FRAME.pack(DAEMON_EXIT, code))
+            except OSError:
+                pass  # Client went away mid-command
+
+    def control(self, argv: List[str], out) -> int:
+        """Answer `daemon status` / `daemon stop` sent by a client"""
+        action = argv[0] if argv else 'status'
+        if action == 'stop':
+            self.shutdown()
+            print(f"{Colors.GREEN}[OK] Daemon stopped{Colors.RESET}", file=out)
+            return 0
+        if action == 'status':
+            idle = sum(len(conns) for conns in CONNECTION_POOL._idle.values())
+            print(f"{Colors.GREEN}[OK] Daemon running{Colors.RESET} "
+                  f"{Colors.GRAY}(pid {os.getpid()}, up {format_duration(time.time() - self.started)}, "
+                  f"{self.served} commands, {idle} idle connections){Colors.RESET}", file=out)
+            return 0
+        print(f"{Colors.YELLOW}[!] Daemon already running at {self.path}{Colors.RESET}", file=out)
+        return 1
+
+    def run(self, argv: List[str], request: Dict[str, Any], stdout, stderr) -> int:
+        """Run one command with the client's cwd, RESTCLI_* variables and output streams"""
+        client_env = request.get('env') or {}
+        saved_env = {key: os.environ.get(key)
+                     for key in set(client_env) | set(_client_environment())}
+        saved_cwd = os.getcwd()
+        code = 0
+        try:
+            os.chdir(request.get('cwd') or saved_cwd)
+            for key in saved_env:
+                if key in client_env:
+                    os.environ[key] = str(client_env[key])
+                else:
+                    os.environ.pop(key, None)
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    run_command(argv)
+                except SystemExit as e:
+                    if isinstance(e.code, int) or e.code is None:
+                        code = e.code or 0
+                    else:
+                        print(e.code, file=stderr)
+                        code = 1
+                except Exception:
+                    import traceback
+                    traceback.print_exc(file=stderr)
+                    code = 1
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            os.chdir(saved_cwd)
+            self.served += 1
+        return code
+
+
+def daemon_forwardable(argv: List[str]) -> bool:
+    """Whether argv can run in the daemon: a known, short-lived command that does not read stdin"""
+    if not argv or argv[0] not in COMMAND_PARSERS or argv[0] in ('daemon', 'mock'):
+        return False
+    # The caller's stdin is not forwarded, so `-T -` and `--data-source -` must run locally
+    for arg, value in zip(argv, argv[1:] + ['']):
+        if arg in ('-T', '--upload-file') and value == '-':
+            return False
+        if arg in ('-T-', '--upload-file=-', '--data-source=-'):
+            return False
+        if arg == '--data-source' and value == '-':
+            return False
+    return True
+
+
+def forward_to_daemon(argv: List[str], path: Path = DAEMON_SOCKET,
+                      stdout: Optional[BinaryIO] = None,
+                      stderr: Optional[BinaryIO] = None) -> Optional[int]:
+    """Run argv in the daemon listening at path, copying its output here.
+
+    Returns the command's exit code, or None if no daemon is listening.
+    """
+    import socket
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+    
+    streams = {DAEMON_STDOUT: stdout or sys.stdout.buffer, DAEMON_STDERR: stderr or sys.stderr.buffer}
+    request = {
+        'argv': argv,
+        'cwd': os.getcwd(),
+        'env': _client_environment(),
+        'tty': [sys.stdout.isatty(), sys.stderr.isatty()],
+    }
+    with sock:
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        reader = sock.makefile('rb')
+        while True:
+            header = reader.read(DAEMON_FRAME.size)
+            if len(header) < DAEMON_FRAME.size:
+                print(f"{Colors.RED}[X] Daemon closed the connection{Colors.RESET}", file=sys.stderr)
+                return 1
+            channel, length = DAEMON_FRAME.unpack(header)
+            if channel == DAEMON_EXIT:
+                return length
+            stream = streams.get(channel, streams[DAEMON_STDERR])
+            stream.write(reader.read(length))
+            stream.flush()
+
+
+def cmd_daemon(args):
+    """Run the resident daemon, or query/stop a running one"""
+    if args.action in ('status', 'stop'):
+        code = forward_to_daemon(['daemon', args.action])
+        if code is None:
+            print(f"{Colors.YELLOW}[!] Daemon not running{Colors.RESET}")
+        return
+    
+    import socket
+    if not hasattr(socket, 'AF_UNIX'):
+        print(f"{Colors.RED}[X] Daemon mode needs Unix domain sockets{Colors.RESET}")
+        return
+    if forward_to_daemon(['daemon', 'start']) is not None:
+        return
+    
+    ensure_data_dirs()
+    with contextlib.suppress(FileNotFoundError):
+        DAEMON_SOCKET.unlink()  # Left behind by a daemon that was killed
+    print(f"{Colors.GREEN}[OK] Daemon listening on {DAEMON_SOCKET}{Colors.RESET} "
+          f"{Colors.GRAY}(Ctrl+C or `restcli daemon stop` to exit){Colors.RESET}", flush=True)
+    try:
+        RestDaemon(DAEMON_SOCKET).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+MOCK_ROUTES = {
+    '/': 'This list of routes',
+    '/echo': 'Any method: the request line, headers and body as JSON',
+    '/bytes/N': 'N bytes of application/octet-stream',
+    '/json/N': 'A JSON array of N objects',
+    '/status/CODE': 'That status code, with a small JSON body',
+    '/delay/MS': 'Answer after MS milliseconds',
+}
+MOCK_OPTIONS = '?latency=MS, ?gzip=1, ?chunked=1 and ?fail=RATE apply to every route'
+
+
+@functools.lru_cache(maxsize=None)
+def _mock_handler_class() -> type:
+    """Define the mock request handler on first use, importing http.server"""
+    import http.server
+    import urllib.parse
+
+    class MockHandler(http.server.BaseHTTPRequestHandler):
+        """Serves MOCK_ROUTES for the MockServer in `self.server.mock`"""
+        protocol_version = 'HTTP/1.1'
+        server_version = f'restcli-mock/{__version__}'
+        # Send headers and body in one segment; handle_one_request flushes
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def handle_any(self):
+            mock = self.server.mock
+            url = urllib.parse.urlsplit(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            try:
+                data = self.read_body()
+            except ValueError:
+                self.close_connection = True
+                return self.reply(400, {'error': 'malformed request body'})
+            try:
+                latency = float(query['latency']) / 1000 if 'latency' in query else mock.delay()
+                fail = float(query.get('fail', mock.error_rate))
+            except ValueError:
+                return self.reply(400, {'error': 'latency and fail must be numbers'})
+            mock.count()
+            if latency > 0:
+                time.sleep(latency)
+            if fail > 0 and mock.chance() < fail:
+                return self.reply(mock.error_status, {'error': 'injected failure'})
+            
+            parts = url.path.strip('/').split('/')
+            route, arg = parts[0], parts[1] if len(parts) == 2 else None
+            gzip, chunked = query.get('gzip') == '1', query.get('chunked') == '1'
+            if url.path == '/':
+                return self.reply(200, {'routes': MOCK_ROUTES, 'options': MOCK_OPTIONS}, gzip, chunked)
+            if url.path == '/echo':
+                return self.reply(200, {
+                    'method': self.command, 'path': url.path, 'query': query,
+                    'headers': dict(self.headers.items()),
+                    'body': data.decode('utf-8', 'replace'), 'length': len(data),
+                }, gzip, chunked)
+            if route in ('bytes', 'json', 'status', 'delay') and arg and arg.isdigit():
+                n = int(arg)
+                if route == 'bytes':
+                    return self.send_body(200, mock.payload(n), 'application/octet-stream', gzip, chunked)
+                if route == 'json':
+                    return self.reply(200, [{'id': i, 'name': f'item {i}', 'active': i % 2 == 0}
+                                            for i in range(n)], gzip, chunked)
+                if route == 'status':
+                    if not 100 <= n <= 599:
+                        return self.reply(400, {'error': 'status must be 100-599'})
+                    return self.reply(n, {'status': n}, gzip, chunked)
+                time.sleep(n / 1000)
+                return self.reply(200, {'delayed_ms': n}, gzip, chunked)
+            self.reply(404, {'error': f'no route {url.path}', 'routes': sorted(MOCK_ROUTES)})
+
+        do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = handle_any
+
+        def read_body(self) -> bytes:
+            """Read the request body, sized by Content-Length or chunked"""
+            if 'chunked' not in self.headers.get('Transfer-Encoding', '').lower():
+                length = int(self.headers.get('Content-Length') or 0)
+                return self.rfile.read(length) if length else b''
+            chunks = []
+            while True:
+                size = int(self.rfile.readline(1024).split(b';')[0], 16)
+                if size == 0:
+                    # Skip any trailers up to the blank line
+                    while self.rfile.readline(1024).strip():
+                        pass
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline(1024)
+
+        def reply(self, status: int, value: Any, gzip: bool = False, chunked: bool = False):
+            self.send_body(status, json.dumps(value).encode(), 'application/json', gzip, chunked)
+
+        def send_body(self, status: int, body: bytes, content_type: str,
+                      gzip: bool = False, chunked: bool = False):
+            if gzip:
+                import gzip as gzip_module
+                body = gzip_module.compress(body, 1)
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            if gzip:
+                self.send_header('Content-Encoding', 'gzip')
+            if chunked:
+                self.send_header('Transfer-Encoding', 'chunked')
+            else:
+                self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command == 'HEAD' or status in (204, 304) or status < 200:
+                return
+            if not chunked:
+                self.wfile.write(body)
+                return
+            for start in range(0, len(body), STREAM_CHUNK_SIZE):
+                chunk = body[start:start + STREAM_CHUNK_SIZE]
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+
+        def log_message(self, *args):
+            pass
+
+    return MockHandler
+
+
+class MockServer:
+    """A local HTTP endpoint for benchmarks and tests, from http.server.
+
+    Serves MOCK_ROUTES over keep-alive HTTP/1.1 from a ThreadingHTTPServer.
+    Each response waits `latency` seconds plus up to `jitter` more, and
+    fails with `error_status` at `error_rate`; per-request query options
+    override both. `seed` makes the jitter and failures repeatable.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 seed: Optional[int] = None):
+        import http.server
+        import random
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._payload = b''
+        self.httpd = http.server.ThreadingHTTPServer((host, port), _mock_handler_class(),
+                                                     bind_and_activate=False)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 128  # Room for a bench's burst of connects
+        try:
+            self.httpd.server_bind()
+            self.httpd.server_activate()
+        except OSError:
+            self.httpd.server_close()
+            raise
+        self.httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def chance(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def delay(self) -> float:
+        """Seconds to wait before answering: latency plus jitter"""
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def payload(self, size: int) -> bytes:
+        """`size` bytes of a repeating pattern, built once and sliced"""
+        if len(self._payload) < size:
+            with self._lock:
+                if len(self._payload) < size:
+                    pattern = bytes(range(256))
+                    self._payload = pattern * (size // 256 + 1)
+        return self._payload[:size]
+
+    def start(self) -> 'MockServer':
+        """Serve on a background thread and return self"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        if self._thread is not None:
+            self.httpd.shutdown()
+            self._thread.join()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'MockServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def cmd_mock(args):
+    """Serve the mock endpoint until interrupted"""
+    try:
+        server = MockServer(args.host, args.port, args.latency / 1000, args.jitter / 1000,
+                            args.error_rate, args.error_status, args.seed)
+    except OSError as e:
+        print(f"{Colors.RED}[X] Cannot listen on {args.host}:{args.port}: {e}{Colors.RESET}")
+        return
+    print(f"{Colors.GREEN}[OK] Mock server listening on {server.url}{Colors.RESET} "
+          f"{Colors.GRAY}(Ctrl+C to stop){Colors.RESET}")
+    for route, description in MOCK_ROUTES.items():
+        print(f"  {Colors.CYAN}{route:14s}{Colors.RESET} {description}")
+    print(f"  {Colors.GRAY}{MOCK_OPTIONS}{Colors.RESET}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    print(f"\n{Colors.GRAY}Served {server.requests} requests{Colors.RESET}")
+
+
+def add_request_arguments(parser: argparse.ArgumentParser):
+    """Add the URL, header, body, auth and timeout options shared by request commands"""
+    parser.add_argument('url', help='Request URL')
+    parser.add_argument('-H', '--header', action='append', help='Request header (can be used multiple times)')
+    parser.add_argument('-d', '--data', help='Request body data')
+    parser.add_argument('-f', '--data-file', help='Read body from file')
+    parser.add_argument('--bearer', help='Bearer token authentication')
+    parser.add_argument('--basic', help='Basic authentication (username:password)')
+    parser.add_argument('--api-key', help='API key value')
+    parser.add_argument('--api-key-header', default='X-API-Key', help='API key header name (default: X-API-Key)')
+    parser.add_argument('-t', '--timeout', type=int, default=30, help='Request timeout in seconds (default: 30)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Verbose output')
+    add_retry_arguments(parser)
+    add_resolve_argument(parser)
+
+
+def add_retry_arguments(parser: argparse.ArgumentParser):
+    """Add the --retries options"""
+    parser.add_argument('--retries', type=int, default=0,
+                        help='Re-send on connection errors and 429/502/503/504 up to N times (default: 0)')
+    parser.add_argument('--retry-backoff', type=float, default=0.2, metavar='SECONDS',
+                        help='[--retries] Base of the jittered exponential backoff (default: 0.2)')
+    parser.add_argument('--retry-budget', type=float, default=20, metavar='PERCENT',
+                        help='[--retries] Cap retries at this %% of requests, after the first 10 (default: 20)')
+    parser.add_argument('--retry-unsafe', action='store_true',
+                        help='[--retries] Also retry POST and PATCH, which may not be idempotent')
+
+
+def add_rate_limit_arguments(parser: argparse.ArgumentParser):
+    """Add the per-host rate limiting options of multi-request commands"""
+    parser.add_argument('--rate-limit', type=float, metavar='RPS',
+                        help='Send at most RPS requests per second to each host')
+    parser.add_argument('--burst', type=float, help='[--rate-limit] Requests allowed in a burst (default: RPS)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Halve per-host concurrency on 429/503, then ramp back up')
+
+
+def add_resolve_argument(parser: argparse.ArgumentParser):
+    parser.add_argument('--resolve', action='append', metavar='HOST:PORT:ADDR',
+                        help='Connect to ADDR for HOST:PORT instead of resolving it (repeatable)')
+
+
+def add_output_arguments(parser: argparse.ArgumentParser):
+    """Add the options that limit how much of a JSON response is printed"""
+    parser.add_argument('--max-items', type=int, help='Show at most N elements of each JSON array')
+    parser.add_argument('--max-depth', type=int, help='Collapse JSON nested deeper than N levels')
+
+
+def add_format_arguments(parser: argparse.ArgumentParser, body: bool = True):
+    """Add --format (and --body) for machine-readable per-request records"""
+    parser.add_argument('--format', choices=['text', 'jsonl', 'csv', 'raw'], default='text',
+                        help='Print one record per request as JSONL or CSV, or only raw bodies (default: text)')
+    if body:
+        parser.add_argument('--body', action='store_true',
+                            help='[--format jsonl/csv] Include the response body in each record')
+
+
+def add_diff_arguments(parser: argparse.ArgumentParser, baseline: str):
+    """Add --diff and --ignore for comparing response bodies with a baseline"""
+    parser.add_argument('--diff', action='store_true', help=f'Structurally diff each body against {baseline}')
+    parser.add_argument('--ignore', action='append', metavar='PATH',
+                        help="[--diff] Skip a JSON path, e.g. meta.updated_at, items[*].id, **.etag (repeatable)")
+
+
+def configure_method_parser(parser: argparse.ArgumentParser, method: str):
+    add_request_arguments(parser)
+    parser.add_argument('-o', '--output', help="Stream the response body to a file ('-' for stdout)")
+    parser.add_argument('-C', '--continue', dest='resume', action='store_true',
+                        help='Resume a partial --output download with a Range request')
+    parser.add_argument('-T', '--upload-file',
+                        help="Stream a file ('-' for stdin) as the raw body, without {{VAR}} substitution")
+    parser.add_argument('--data-source', metavar='FILE',
+                        help="Send once per row of a .csv or JSONL file ('-' for stdin), "
+                             "with the row's fields as {{VAR}}s")
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='[--data-source] Concurrent requests (default: 8)')
+    parser.add_argument('--results', metavar='FILE',
+                        help="[--data-source] Results file ('-' for stdout, default: <source>.results.jsonl)")
+    add_rate_limit_arguments(parser)
+    add_format_arguments(parser)
+    add_output_arguments(parser)
+    parser.set_defaults(method=method, func=cmd_request)
+
+
+def configure_bench_parser(parser: argparse.ArgumentParser):
+    add_request_arguments(parser)
+    parser.add_argument('-X', '--method', default='get',
+                        choices=['get', 'post', 'put', 'delete', 'patch'],
+                        help='HTTP method (default: get)')
+    parser.add_argument('-c', '--concurrency', type=int, default=10, help='Concurrent workers (default: 10)')
+    parser.add_argument('-n', '--requests', type=int, help='Total requests to send (default: 100 unless --duration)')
+    parser.add_argument('--duration', type=float, help='Run for this many seconds')
+    parser.add_argument('--rps', type=float, help='Target aggregate requests per second')
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread',
+                        help='Worker threads or asyncio coroutines on one thread (default: thread)')
+    add_rate_limit_arguments(parser)
+    parser.set_defaults(func=cmd_bench)
+
+
+def configure_history_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('action', nargs='?', choices=['list', 'query'], default='list',
+                        help='list recent entries (default) or query the SQLite backend')
+    parser.add_argument('-l', '--limit', type=int, default=100, help='Number of entries/groups to show (default: 100)')
+    parser.add_argument('--method', help='[query] Only this HTTP method')
+    parser.add_argument('--host', help='[query] Only this host')
+    parser.add_argument('--path', help='[query] Only paths matching this (%% wildcards)')
+    parser.add_argument('--min-status', type=int, help='[query] Minimum status code')
+    parser.add_argument('--max-status', type=int, help='[query] Maximum status code')
+    parser.add_argument('--since', help='[query] Only the last N s/m/h/d, e.g. 1h')
+    parser.add_argument('--group-by', choices=list(SqliteHistoryStore.GROUP_COLUMNS),
+                        help='[query] Aggregate count, errors and latency per group')
+    parser.add_argument('--percentile', type=float, default=95, help='[query] Latency percentile to report (default: 95)')
+    add_format_arguments(parser, body=False)
+    parser.set_defaults(func=cmd_history)
+
+
+def configure_replay_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('selection', nargs='?',
+                        help="History entry number(s) from most recent: 1, 1-500 or 1-10,15 (default: 1, or all with --filter)")
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='Parallel replays for a range (default: 8)')
+    parser.add_argument('--filter', action='append',
+                        help='Only entries matching e.g. "method=GET,host=*.example.com,status>=500" (repeatable)')
+    parser.add_argument('-t', '--timeout', type=int, default=30, help='Request timeout in seconds (default: 30)')
+    add_diff_arguments(parser, 'the recorded response')
+    add_retry_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_resolve_argument(parser)
+    add_format_arguments(parser)
+    add_output_arguments(parser)
+    parser.set_defaults(func=cmd_replay)
+
+
+def configure_env_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('action', choices=['set', 'get', 'list', 'delete'], help='Action to perform')
+    parser.add_argument('key', nargs='?', help='Variable key')
+    parser.add_argument('value', nargs='?', help='Variable value')
+    parser.set_defaults(func=cmd_env)
+
+
+def configure_cache_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('action', choices=['stats', 'clear'], help='Action to perform')
+    parser.set_defaults(func=cmd_cache)
+
+
+def configure_collection_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('action', choices=['save', 'add', 'load', 'run', 'list', 'delete'], help='Action to perform')
+    parser.add_argument('name', nargs='?', help='Collection name')
+    parser.add_argument('--as', dest='step', help='[add] Step name (default: stepN)')
+    parser.add_argument('--depends-on', action='append', help='[add] Step that must finish first (repeatable)')
+    parser.add_argument('--extract', action='append', help='[add] VAR=path to capture from the response, e.g. TOKEN=body.access_token')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='[run] Parallel workers (default: 8)')
+    parser.add_argument('-t', '--timeout', type=int, default=30, help='Request timeout in seconds (default: 30)')
+    add_diff_arguments(parser, 'the previous `collection run --diff`')
+    add_retry_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_resolve_argument(parser)
+    add_format_arguments(parser)
+    add_output_arguments(parser)
+    parser.set_defaults(func=cmd_collection)
+
+
+def configure_mock_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('-p', '--port', type=int, default=8080, help='Port to listen on (default: 8080)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind (default: 127.0.0.1)')
+    parser.add_argument('--latency', type=float, default=0, metavar='MS', help='Delay every response by MS milliseconds')
+    parser.add_argument('--jitter', type=float, default=0, metavar='MS', help='Add up to MS random milliseconds of delay')
+    parser.add_argument('--error-rate', type=float, default=0, metavar='RATE',
+                        help='Fraction of requests (0-1) answered with --error-status')
+    parser.add_argument('--error-status', type=int, default=503, help='Status of injected failures (default: 503)')
+    parser.add_argument('--seed', type=int, help='Seed the jitter and failures for repeatable runs')
+    parser.set_defaults(func=cmd_mock)
+
+
+def configure_har_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('action', choices=['export', 'import', 'replay'], help='Action to perform')
+    parser.add_argument('file', nargs='?', help="HAR file ([export] default: stdout)")
+    parser.add_argument('-l', '--limit', type=int, help='[export] Only the N most recent requests')
+    parser.add_argument('--host', action='append', metavar='PATTERN',
+                        help='[import/replay] Only entries whose host matches, e.g. *.example.com (repeatable)')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='[replay] Parallel requests (default: 8)')
+    parser.add_argument('--timing', action='store_true',
+                        help='[replay] Keep the recorded gaps between requests instead of sending at once')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='[replay --timing] Time scale, e.g. 2 replays twice as fast (default: 1)')
+    parser.add_argument('-t', '--timeout', type=int, default=30, help='Request timeout in seconds (default: 30)')
+    add_retry_arguments(parser)
+    add_rate_limit_arguments(parser)
+    add_resolve_argument(parser)
+    add_format_arguments(parser)
+    parser.set_defaults(func=cmd_har)
+
+
+def configure_dns_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('action', choices=['stats', 'clear'], help='Action to perform')
+    parser.set_defaults(func=cmd_dns)
+
+
+def configure_daemon_parser(parser: argparse.ArgumentParser):
+    parser.add_argument('action', nargs='?', choices=['start', 'status', 'stop'], default='start',
+                        help='start in the foreground (default), or query/stop a running daemon')
+    parser.set_defaults(func=cmd_daemon)
+
+
+# Subcommand name -> (help, function that adds its arguments)
+COMMAND_PARSERS = {
+    **{method: (f'{method.upper()} request', functools.partial(configure_method_parser, method=method))
+       for method in ['get', 'post', 'put', 'delete', 'patch']},
+    'bench': ('Load test an endpoint', configure_bench_parser),
+    'history': ('Show or query request history', configure_history_parser),
+    'replay': ('Replay request from history', configure_replay_parser),
+    'env': ('Manage environment variables', configure_env_parser),
+    'cache': ('Inspect the response cache (enable with RESTCLI_CACHE=1)', configure_cache_parser),
+    'dns': ('Inspect the DNS cache', configure_dns_parser),
+    'collection': ('Manage request collections', configure_collection_parser),
+    'har': ('Export history as HAR, or import or replay a HAR file', configure_har_parser),
+    'daemon': ('Keep a warm process that other invocations forward to', configure_daemon_parser),
+    'mock': ('Serve a local mock API for offline tests and benchmarks', configure_mock_parser),
+}
+
+
+def main(argv: Optional[List[str]] = None):
     """Main entry point"""
+    argv = sys.argv[1:] if argv is None else argv
+    
+    # Hand the command to a running daemon; fall back to running it here
+    if (daemon_forwardable(argv) and not os.environ.get('RESTCLI_NO_DAEMON')
+            and DAEMON_SOCKET.exists()):
+        code = forward_to_daemon(argv)
+        if code is not None:
+            if code:
+                sys.exit(code)
+            return
+    
+    run_command(argv)
+
+
+def run_command(argv: List[str]):
+    """Parse argv and run the command in this process"""
     parser = argparse.ArgumentParser(
         description='RestCLI - Smart REST API Testing Tool',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -590,55 +5555,27 @@ Examples:
   restcli post https://api.example.com/users -d '{"name": "John"}'
   restcli get https://api.example.com/data -H "Authorization: Bearer {{TOKEN}}"
   restcli env set TOKEN abc123
+  restcli bench https://api.example.com/health -c 20 --duration 10
   restcli history
   restcli replay 1
   restcli collection save myrequest
   restcli collection load myrequest
+  restcli collection run smoke -w 16
+  restcli daemon &
         """
     )
     
     subparsers = parser.add_subparsers(dest='command', help='Commands')
     
-    # HTTP methods (GET, POST, PUT, DELETE, PATCH)
-    for method in ['get', 'post', 'put', 'delete', 'patch']:
-        method_parser = subparsers.add_parser(method, help=f'{method.upper()} request')
-        method_parser.add_argument('url', help='Request URL')
-        method_parser.add_argument('-H', '--header', action='append', help='Request header (can be used multiple times)')
-        method_parser.add_argument('-d', '--data', help='Request body data')
-        method_parser.add_argument('-f', '--data-file', help='Read body from file')
-        method_parser.add_argument('--bearer', help='Bearer token authentication')
-        method_parser.add_argument('--basic', help='Basic authentication (username:password)')
-        method_parser.add_argument('--api-key', help='API key value')
-        method_parser.add_argument('--api-key-header', default='X-API-Key', help='API key header name (default: X-API-Key)')
-        method_parser.add_argument('-t', '--timeout', type=int, default=30, help='Request timeout in seconds (default: 30)')
-        method_parser.add_argument('-v', '--verbose', action='store_true', help='Verbose output')
-        method_parser.set_defaults(method=method, func=cmd_request)
-    
-    # History command
-    history_parser = subparsers.add_parser('history', help='Show request history')
-    history_parser.add_argument('-l', '--limit', type=int, help='Limit number of entries')
-    history_parser.set_defaults(func=cmd_history)
-    
-    # Replay command
-    replay_parser = subparsers.add_parser('replay', help='Replay request from history')
-    replay_parser.add_argument('number', type=int, help='History entry number (from most recent)')
-    replay_parser.set_defaults(func=cmd_replay)
-    
-    # Environment command
-    env_parser = subparsers.add_parser('env', help='Manage environment variables')
-    env_parser.add_argument('action', choices=['set', 'get', 'list', 'delete'], help='Action to perform')
-    env_parser.add_argument('key', nargs='?', help='Variable key')
-    env_parser.add_argument('value', nargs='?', help='Variable value')
-    env_parser.set_defaults(func=cmd_env)
-    
-    # Collection command
-    collection_parser = subparsers.add_parser('collection', help='Manage request collections')
-    collection_parser.add_argument('action', choices=['save', 'load', 'list', 'delete'], help='Action to perform')
-    collection_parser.add_argument('name', nargs='?', help='Collection name')
-    collection_parser.set_defaults(func=cmd_collection)
+    # Every command is listed, but only the one being run gets its options built
+    command = next((arg for arg in argv if not arg.startswith('-')), None)
+    for name, (help_text, configure) in COMMAND_PARSERS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        if name == command:
+            configure(subparser)
     
     # Parse arguments
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if not args.command:
         print_banner()
@@ -647,7 +5584,13 @@ Examples:
     
     # Execute command
     if hasattr(args, 'func'):
-        args.func(args)
+        try:
+            pins = dict(parse_resolve(spec) for spec in getattr(args, 'resolve', None) or [])
+        except ValueError as e:
+            print(f"{Colors.RED}[X] {e}{Colors.RESET}")
+            return
+        with resolve_overrides(pins):
+            args.func(args)
     else:
         parser.print_help()
 